@@ -0,0 +1 @@
+"""Benchmarks for the risk-return pipeline (run from the repository root)."""
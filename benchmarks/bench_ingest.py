@@ -0,0 +1,93 @@
+"""Benchmark concurrent NAV ingestion against serial ``read_csv`` + ``concat``.
+
+Writes one synthetic CSV per fund into a temporary directory, then times
+
+* ``serial``      - ``pd.read_csv`` of every file and ``pd.concat(axis=1)``,
+* ``async-files`` - ``nav_ingest.ingest_navs`` over the file paths,
+* ``async-http``  - ``ingest_navs`` over the local HTTP price-service
+  stand-in, which sleeps ``--delay`` seconds per request::
+
+    python -m benchmarks.bench_ingest --sources 2000 --delay 0.05
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.price_service import serve_directory
+from benchmarks.synthetic import synthetic_navs
+from nav_ingest import DEFAULT_CONCURRENCY, ingest_navs
+
+
+def write_sources(directory, sources=2000, days=1500, seed=0):
+    """One ``<column>.csv`` per column of ``synthetic_navs``; returns the paths."""
+    prices = synthetic_navs(sources - 1, days, seed)
+    paths = []
+    for name in prices.columns:
+        path = Path(directory) / f"{name}.csv"
+        prices[[name]].to_csv(path)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sources", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="price service latency per request in seconds (default: %(default)s)")
+    parser.add_argument("--skip-serial", action="store_true",
+                        help="do not time the serial baseline")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_sources(directory, args.sources, args.days)
+        timings = {}
+
+        reference = None
+        if not args.skip_serial:
+            start = time.perf_counter()
+            reference = pd.concat([pd.read_csv(path, index_col="date", parse_dates=True)
+                                   for path in paths], axis=1, sort=True)
+            timings["serial"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prices = ingest_navs(paths, concurrency=args.concurrency)
+        timings["async-files"] = time.perf_counter() - start
+
+        server, url = serve_directory(directory, delay=args.delay)
+        try:
+            start = time.perf_counter()
+            served = ingest_navs([f"{url}/{quote(path.name)}" for path in paths],
+                                 concurrency=args.concurrency)
+            timings["async-http"] = time.perf_counter() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    if reference is not None and not np.array_equal(reference.to_numpy(), prices.to_numpy(),
+                                                    equal_nan=True):
+        print("async-files result differs from the serial baseline", file=sys.stderr)
+        return 1
+    if not served.equals(prices):
+        print("async-http result differs from async-files", file=sys.stderr)
+        return 1
+
+    print(f"{args.sources} sources x {args.days} days, concurrency {args.concurrency}, "
+          f"service latency {args.delay * 1000:.0f} ms")
+    for name, seconds in timings.items():
+        print(f"  {name:<12} {seconds:8.3f}s")
+    serial_http = args.sources * args.delay
+    print(f"  (serial requests would wait at least {serial_http:.1f}s on latency alone)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
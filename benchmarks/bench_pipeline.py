@@ -0,0 +1,220 @@
+"""Benchmark the stages of the risk-return pipeline on synthetic NAV data.
+
+Each stage the notebook performs (CSV load, ``pct_change``, ``cumprod``,
+annualized std / Sharpe, the 21-day rolling std and the 60-day rolling
+cov / var / beta) is timed for the library implementation ("numpy") and for
+the notebook's pandas expressions ("pandas"), on one or more synthetic
+``funds x days`` sizes.  Every stage reports its best wall time, throughput
+in cells (dates x columns) per second and its tracemalloc peak.
+
+Results can be saved as a JSON baseline and later runs compared against it;
+the comparison exits with status 1 when a stage is slower than the baseline
+by more than the tolerance::
+
+    python -m benchmarks.bench_pipeline --sizes 4x1500 500x2500 --save-baseline base.json
+    python -m benchmarks.bench_pipeline --sizes 4x1500 500x2500 --compare base.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import risk_return_analysis as rra
+from benchmarks.synthetic import write_synthetic_csv
+
+
+DEFAULT_SIZES = ("4x1500", "500x2500")
+ENGINES = ("numpy", "pandas")
+
+
+# ---
+# Stages: each takes the shared context and runs one step of the pipeline
+# ---
+
+def _numpy_cumprod(ctx):
+    cum = np.cumprod(ctx["block"] + 1.0, axis=0)
+    cum -= 1.0
+    return cum
+
+
+def _numpy_ann_std_sharpe(ctx):
+    block = ctx["block"]
+    ann_std = block.std(axis=0, ddof=1) * np.sqrt(rra.NUM_TRADING_DAYS)
+    return block.mean(axis=0) * rra.NUM_TRADING_DAYS / ann_std
+
+
+def _pandas_ann_std_sharpe(ctx):
+    returns = ctx["returns"]
+    ann_std = returns.std() * np.sqrt(rra.NUM_TRADING_DAYS)
+    return returns.mean() * rra.NUM_TRADING_DAYS / ann_std
+
+
+def _pandas_rolling_beta(ctx):
+    returns = ctx["returns"]
+    market = returns[rra.MARKET]
+    var = market.rolling(window=60).var()
+    cov = returns.drop(columns=rra.MARKET).rolling(window=60).cov(market)
+    return cov.div(var, axis=0)
+
+
+STAGES = {
+    "numpy": {
+        "load_csv": lambda ctx: rra.load_navs(ctx["csv_path"]),
+        "pct_change": lambda ctx: rra.daily_returns(ctx["prices"]),
+        "cumprod": _numpy_cumprod,
+        "ann_std_sharpe": _numpy_ann_std_sharpe,
+        "rolling_std21": lambda ctx: rra.rolling_std(ctx["returns"], window=21),
+        "rolling_beta60": lambda ctx: rra.rolling_beta(ctx["returns"], window=60),
+        "risk_metrics": lambda ctx: rra.compute_risk_metrics(ctx["prices"]),
+    },
+    "pandas": {
+        "load_csv": lambda ctx: pd.read_csv(ctx["csv_path"], index_col="date", parse_dates=True),
+        "pct_change": lambda ctx: ctx["prices"].pct_change().dropna(),
+        "cumprod": lambda ctx: (1 + ctx["returns"]).cumprod() - 1,
+        "ann_std_sharpe": _pandas_ann_std_sharpe,
+        "rolling_std21": lambda ctx: ctx["returns"].rolling(window=21).std(),
+        "rolling_beta60": _pandas_rolling_beta,
+    },
+}
+
+
+# ---
+# Measurement
+# ---
+
+def parse_size(text):
+    """Parse ``"FUNDSxDAYS"`` into ``(funds, days)``."""
+    funds, days = text.lower().split("x")
+    return int(funds), int(days)
+
+
+def time_stage(func, ctx, repeat=3):
+    """Best wall time of ``func(ctx)`` over ``repeat`` runs and its tracemalloc peak."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(ctx)
+        best = min(best, time.perf_counter() - start)
+
+    # Measure memory in a separate run so tracing does not skew the timings
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, engines=ENGINES, stages=None, repeat=3, seed=0):
+    """Run every selected stage for every size and engine.
+
+    Returns ``{"meta": {...}, "results": {"<size>/<engine>/<stage>": {...}}}``
+    where each result holds seconds, cells_per_sec and peak_bytes.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            funds, days = parse_size(size)
+            csv_path = write_synthetic_csv(Path(tmp) / f"navs_{size}.csv", funds, days, seed)
+            prices = rra.load_navs(csv_path)
+            returns = rra.daily_returns(prices)
+            ctx = {
+                "csv_path": csv_path,
+                "prices": prices,
+                "returns": returns,
+                "block": returns.to_numpy(),
+            }
+            cells = prices.size
+            for engine in engines:
+                for stage, func in STAGES[engine].items():
+                    if stages and stage not in stages:
+                        continue
+                    seconds, peak = time_stage(func, ctx, repeat)
+                    results[f"{size}/{engine}/{stage}"] = {
+                        "seconds": seconds,
+                        "cells_per_sec": cells / seconds if seconds else float("inf"),
+                        "peak_bytes": peak,
+                    }
+    return {"meta": environment(), "results": results}
+
+
+def environment():
+    """Versions and host details stored alongside a baseline."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(report, baseline, tolerance=0.25):
+    """Stages slower than the baseline by more than ``tolerance`` (a fraction).
+
+    Returns a list of ``(key, baseline_seconds, seconds)`` tuples.
+    """
+    regressions = []
+    for key, result in report["results"].items():
+        base = baseline["results"].get(key)
+        if base is not None and result["seconds"] > base["seconds"] * (1.0 + tolerance):
+            regressions.append((key, base["seconds"], result["seconds"]))
+    return regressions
+
+
+def format_report(report):
+    lines = [f"{'size/engine/stage':<40} {'seconds':>10} {'Mcells/s':>10} {'peak MiB':>10}"]
+    for key, result in report["results"].items():
+        lines.append(
+            f"{key:<40} {result['seconds']:>10.5f} {result['cells_per_sec'] / 1e6:>10.2f} "
+            f"{result['peak_bytes'] / 2**20:>10.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES),
+                        help="FUNDSxDAYS sizes to generate (default: %(default)s)")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--stages", nargs="+", help="only run these stages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", type=Path, help="write the results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown versus the baseline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.engines, args.stages, args.repeat, args.seed)
+    print(format_report(report))
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2))
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(report, baseline, args.tolerance)
+        for key, base, seconds in regressions:
+            print(f"REGRESSION {key}: {base:.5f}s -> {seconds:.5f}s", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions versus {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""Golden-output equivalence harness against the reference notebook.
+
+``golden_whale_navs.json`` holds what ``risk_return_analysis.ipynb``
+produces on ``Resources/whale_navs.csv``, captured at full precision with the
+notebook's own pandas expressions: the sorted std, annualized std,
+annualized mean and Sharpe ratio, and the tail and mean of the 60-day
+rolling beta of Berkshire Hathaway and Tiger Global (plus the beta means of
+every fund).
+
+Every alternative engine (vectorized, gap-masked, streaming, parallel,
+chunked, float32, cached, memoized, multi-window) recomputes those values and
+is compared against the golden file within its own tolerance; each path is
+timed in the same run.  The gap checks then punch NaN gaps (a fund starting
+late, gaps mid-series) into the returns and compare the gap-aware kernels
+with pandas on them.  Exits with status 1 when any check disagrees::
+
+    python -m benchmarks.golden
+    python -m benchmarks.golden --paths vectorized float32 --repeat 5
+    python -m benchmarks.golden --capture     # rewrite the golden file
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import risk_return_analysis as rra
+
+
+GOLDEN_PATH = Path(__file__).with_name("golden_whale_navs.json")
+BETA_FUNDS = ("BERKSHIRE HATHAWAY INC", "TIGER GLOBAL MANAGEMENT LLC")
+METRICS = ("std", "ann_std", "ann_mean", "sharpe")
+BETA_WINDOW = 60
+TAIL = 5
+
+
+# ---
+# Engines: each returns {"std", "ann_std", "ann_mean", "sharpe": Series,
+# "beta": DataFrame of 60-day betas} covering the columns declared in PATHS
+# ---
+
+def notebook_path(path):
+    # The notebook's pandas expressions, cell by cell
+    prices = pd.read_csv(path, index_col="date", parse_dates=True)
+    returns = prices.pct_change().dropna()
+    std = returns.std()
+    ann_std = std * np.sqrt(rra.NUM_TRADING_DAYS)
+    ann_mean = returns.mean() * rra.NUM_TRADING_DAYS
+    funds = returns.drop(columns=rra.MARKET)
+    var_market = returns[rra.MARKET].rolling(window=BETA_WINDOW).var()
+    cov = funds.rolling(window=BETA_WINDOW).cov(returns[rra.MARKET])
+    beta = pd.DataFrame({name: cov[name] / var_market for name in funds.columns})
+    return {"std": std, "ann_std": ann_std, "ann_mean": ann_mean,
+            "sharpe": ann_mean / ann_std, "beta": beta}
+
+
+def _from_metrics(metrics, beta):
+    return {"std": metrics.std, "ann_std": metrics.ann_std, "ann_mean": metrics.ann_mean,
+            "sharpe": metrics.sharpe, "beta": beta}
+
+
+def vectorized_path(path):
+    metrics = rra.compute_risk_metrics(rra.load_navs(path))
+    return _from_metrics(metrics, rra.rolling_beta(metrics.daily_returns, window=BETA_WINDOW))
+
+
+def masked_path(path):
+    metrics = rra.compute_risk_metrics(rra.load_navs(path), gaps="mask")
+    return _from_metrics(metrics, rra.rolling_beta(metrics.daily_returns, window=BETA_WINDOW))
+
+
+def streaming_path(path):
+    from risk_stream import RiskStream
+
+    prices = rra.load_navs(path)
+    stream = RiskStream(prices.columns, beta_window=BETA_WINDOW)
+    dates, betas = [], []
+    for date, row in zip(prices.index, prices.to_numpy(dtype=np.float64)):
+        if stream.update(row, date=date):
+            dates.append(date)
+            betas.append(stream.rolling_beta)
+    beta = pd.DataFrame(betas, index=pd.DatetimeIndex(dates, name="date"), columns=stream.columns)
+    metrics = stream.metrics()
+    return {"std": metrics["std"], "ann_std": metrics["ann_std"],
+            "ann_mean": metrics["ann_mean"], "sharpe": metrics["sharpe"],
+            "beta": beta.drop(columns=rra.MARKET)}
+
+
+def parallel_path(path):
+    from risk_parallel import run_universe
+
+    result = run_universe(rra.load_navs(path), workers=2, beta_window=BETA_WINDOW)
+    summary = result.summary
+    return {"std": summary["ann_std"] / np.sqrt(rra.NUM_TRADING_DAYS),
+            "ann_std": summary["ann_std"], "ann_mean": summary["ann_mean"],
+            "sharpe": summary["sharpe"], "beta": result.beta}
+
+
+def chunked_path(path):
+    from nav_chunked import run_chunked
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        summary = run_chunked(path, out_dir, chunk_rows=256, beta_window=BETA_WINDOW)
+        beta = pd.read_csv(Path(out_dir) / f"beta_rolling{BETA_WINDOW}.csv",
+                           index_col="date", parse_dates=True)
+    return {name: summary[name] for name in METRICS} | {"beta": beta}
+
+
+def float32_path(path):
+    from fund_matrix import FundMatrix
+
+    returns = FundMatrix.from_frame(rra.load_navs(path)).daily_returns(np.float32)
+    summary = returns.risk_metrics()
+    return {name: summary[name] for name in METRICS} | {
+        "beta": returns.rolling_beta(BETA_WINDOW).to_frame().astype(np.float64)}
+
+
+_cache_dir = None
+
+
+def cached_path(path):
+    # Memory-mapped NAV cache; the first call builds it, later calls hit it.
+    # The cache directory is only created when this path runs
+    global _cache_dir
+    from nav_cache import load_navs_cached
+
+    if _cache_dir is None:
+        _cache_dir = tempfile.TemporaryDirectory(prefix="golden_nav_cache_")
+    metrics = rra.compute_risk_metrics(load_navs_cached(path, cache_dir=_cache_dir.name))
+    return _from_metrics(metrics, rra.rolling_beta(metrics.daily_returns, window=BETA_WINDOW))
+
+
+def memoized_path(path):
+    from metric_cache import CachedAnalysis
+
+    prices = rra.load_navs(path)
+    analysis = CachedAnalysis(prices)
+    metrics = rra.compute_risk_metrics(prices)
+    return _from_metrics(metrics, analysis.beta(window=BETA_WINDOW))
+
+
+def surface_path(path):
+    from risk_surface import risk_surface
+
+    # Gap-masked returns: the surface must only blank windows holding a gap
+    metrics = rra.compute_risk_metrics(rra.load_navs(path), gaps="mask")
+    surface = risk_surface(metrics.daily_returns, windows=(21, BETA_WINDOW))
+    return _from_metrics(metrics, surface.frame("beta", BETA_WINDOW))
+
+
+# Columns an engine must report std / ann_std / ann_mean / sharpe for
+# (every engine must report the beta of every fund)
+ALL_COLUMNS = "all"
+FUNDS_ONLY = "funds"
+
+# Engine name -> (function, relative tolerance, covered columns)
+PATHS = {
+    "notebook": (notebook_path, 1e-12, ALL_COLUMNS),
+    "vectorized": (vectorized_path, 1e-9, ALL_COLUMNS),
+    "masked": (masked_path, 1e-9, ALL_COLUMNS),
+    "streaming": (streaming_path, 1e-9, ALL_COLUMNS),
+    "parallel": (parallel_path, 1e-9, FUNDS_ONLY),
+    "chunked": (chunked_path, 1e-9, ALL_COLUMNS),
+    "float32": (float32_path, 1e-5, ALL_COLUMNS),
+    "cached": (cached_path, 1e-9, ALL_COLUMNS),
+    "memoized": (memoized_path, 1e-9, ALL_COLUMNS),
+    "surface": (surface_path, 1e-9, ALL_COLUMNS),
+}
+
+
+# ---
+# Golden values
+# ---
+
+def golden_values(outputs):
+    """The golden-file structure derived from one engine's outputs."""
+    values = {"sorted": {}, "beta60": {}}
+    for name in METRICS:
+        ordered = outputs[name].sort_values()
+        values["sorted"][name] = {fund: float(value) for fund, value in ordered.items()}
+    beta = outputs["beta"]
+    for fund in BETA_FUNDS:
+        if fund in beta.columns:
+            tail = beta[fund].tail(TAIL)
+            values["beta60"][fund] = {
+                "tail": {date.strftime("%Y-%m-%d"): float(value) for date, value in tail.items()},
+                "mean": float(beta[fund].mean()),
+            }
+    values["beta60_mean"] = {fund: float(value) for fund, value in beta.mean().items()}
+    return values
+
+
+def capture(path=rra.DEFAULT_NAV_PATH, golden_path=GOLDEN_PATH):
+    """Recompute the golden values with the notebook expressions and save them."""
+    from nav_cache import file_sha256
+
+    golden = {"source": Path(path).as_posix(), "sha256": file_sha256(path)}
+    golden.update(golden_values(notebook_path(path)))
+    Path(golden_path).write_text(json.dumps(golden, indent=2) + "\n")
+    return golden
+
+
+def compare(golden, values, rtol, atol=1e-12, covers=ALL_COLUMNS):
+    """Differences between ``values`` and ``golden`` as a list of messages.
+
+    ``covers=FUNDS_ONLY`` excuses a missing market column in the summary
+    metrics; any other missing value is a problem.
+    """
+    problems = []
+    skipped = {rra.MARKET} if covers == FUNDS_ONLY else set()
+
+    def check(label, expected, actual):
+        if actual is None:
+            problems.append(f"{label} missing")
+            return
+        if not np.isclose(actual, expected, rtol=rtol, atol=atol):
+            problems.append(f"{label}: expected {expected!r}, got {actual!r}")
+
+    for name in METRICS:
+        expected = golden["sorted"][name]
+        actual = values["sorted"][name]
+        for fund, value in expected.items():
+            if fund not in skipped:
+                check(f"{name}[{fund}]", value, actual.get(fund))
+        # The sort order of the covered columns must match the notebook
+        order = [fund for fund in expected if fund in actual]
+        got = [fund for fund in actual if fund in expected]
+        if order != got:
+            problems.append(f"{name} order: expected {order}, got {got}")
+
+    for fund, expected in golden["beta60"].items():
+        actual = values["beta60"].get(fund)
+        if actual is None:
+            problems.append(f"beta60[{fund}] missing")
+            continue
+        if list(actual["tail"]) != list(expected["tail"]):
+            problems.append(f"beta60[{fund}] tail dates differ")
+        for date, value in expected["tail"].items():
+            check(f"beta60[{fund}][{date}]", value, actual["tail"].get(date))
+        check(f"beta60[{fund}] mean", expected["mean"], actual["mean"])
+    for fund, value in golden["beta60_mean"].items():
+        check(f"beta60_mean[{fund}]", value, values["beta60_mean"].get(fund))
+    return problems
+
+
+def run(path=rra.DEFAULT_NAV_PATH, golden_path=GOLDEN_PATH, paths=None, repeat=3):
+    """Check and time every engine; returns a list of result dicts."""
+    golden = json.loads(Path(golden_path).read_text())
+    results = []
+    for name in paths or PATHS:
+        engine, rtol, covers = PATHS[name]
+        best = float("inf")
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                outputs = engine(path)
+                best = min(best, time.perf_counter() - start)
+            problems = compare(golden, golden_values(outputs), rtol, covers=covers)
+        except Exception as exc:
+            problems = [f"failed: {type(exc).__name__}: {exc}"]
+        results.append({"path": name, "rtol": rtol, "seconds": best, "problems": problems})
+    return results
+
+
+# ---
+# Gap checks: gap-aware kernels against pandas on NaN-bearing returns
+# ---
+
+def gapped_returns(path):
+    """Daily returns of ``path`` with a late-starting fund and mid-series gaps."""
+    returns = rra.daily_returns(rra.load_navs(path))
+    returns.iloc[:90, 1] = np.nan
+    returns.iloc[400, 2] = np.nan
+    returns.iloc[700:705, 0] = np.nan
+    return returns
+
+
+def gap_checks(path, window=BETA_WINDOW, rtol=1e-9, atol=1e-12):
+    """Problems of the gap-aware kernels against pandas, as a list of messages."""
+    from rolling_correlation import rolling_correlation
+
+    returns = gapped_returns(path)
+    problems = []
+    for kind in ("corr", "cov"):
+        result = rolling_correlation(returns, window, kind=kind)
+        expected = getattr(returns.rolling(window), kind)()
+        for date in returns.index[window - 1:]:
+            actual = result.matrix(date).to_numpy()
+            reference = expected.loc[date].to_numpy()
+            if not np.allclose(actual, reference, rtol=rtol, atol=atol, equal_nan=True):
+                problems.append(f"rolling_correlation({kind}) differs from pandas on {date:%Y-%m-%d}")
+                break
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nav-path", type=Path, default=rra.DEFAULT_NAV_PATH)
+    parser.add_argument("--golden", type=Path, default=GOLDEN_PATH)
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), help="only check these paths")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--capture", action="store_true",
+                        help="rewrite the golden file from the notebook expressions")
+    args = parser.parse_args(argv)
+
+    if args.capture:
+        capture(args.nav_path, args.golden)
+        print(f"golden values written to {args.golden}")
+        return 0
+
+    from nav_cache import file_sha256
+    golden = json.loads(args.golden.read_text())
+    if file_sha256(args.nav_path) != golden["sha256"]:
+        print(f"{args.nav_path} differs from the file the golden values were captured from",
+              file=sys.stderr)
+        return 1
+
+    results = run(args.nav_path, args.golden, args.paths, args.repeat)
+    baseline = next((result["seconds"] for result in results if result["path"] == "notebook"), None)
+    print(f"{'path':<12} {'rtol':>7} {'best s':>9} {'vs notebook':>12}  status")
+    for result in results:
+        speedup = f"{baseline / result['seconds']:.2f}x" if baseline and result["problems"] == [] else ""
+        status = "ok" if not result["problems"] else f"FAIL ({len(result['problems'])})"
+        print(f"{result['path']:<12} {result['rtol']:>7.0e} {result['seconds']:>9.4f} "
+              f"{speedup:>12}  {status}")
+        for problem in result["problems"]:
+            print(f"    {problem}", file=sys.stderr)
+
+    gap_problems = gap_checks(args.nav_path)
+    print(f"gap checks: {'ok' if not gap_problems else f'FAIL ({len(gap_problems)})'}")
+    for problem in gap_problems:
+        print(f"    {problem}", file=sys.stderr)
+    return 1 if gap_problems or any(result["problems"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
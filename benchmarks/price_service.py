@@ -0,0 +1,46 @@
+"""Local HTTP stand-in for a NAV price service.
+
+Serves the files of a directory (``GET /<name>.csv``) from a background
+thread, optionally sleeping ``delay`` seconds per request to mimic a remote
+service's latency::
+
+    server, url = serve_directory("navs", delay=0.05)
+    prices = ingest_navs([f"{url}/FUND 00000.csv", ...])
+    server.shutdown()
+"""
+
+import functools
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _NavServer(ThreadingHTTPServer):
+    # A large listen backlog, so a concurrent burst queues up instead of
+    # being dropped and retried by the clients
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class _NavHandler(SimpleHTTPRequestHandler):
+
+    def __init__(self, *args, delay=0.0, **kwargs):
+        self.delay = delay
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory, host="127.0.0.1", port=0, delay=0.0):
+    """Start serving ``directory``; returns ``(server, base_url)``."""
+    handler = functools.partial(_NavHandler, directory=str(directory), delay=delay)
+    server = _NavServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
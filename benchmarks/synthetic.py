@@ -0,0 +1,35 @@
+"""Synthetic NAV price tables shaped like ``Resources/whale_navs.csv``."""
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import MARKET
+
+
+def synthetic_navs(funds=4, days=1500, seed=0, start="2014-10-01", market=MARKET):
+    """Random NAV prices for ``funds`` funds plus a market column.
+
+    Daily market returns are normal (mean 3e-4, std 1e-2) and each fund's
+    return is ``beta * market + noise`` with a random beta in [0, 0.5) and
+    idiosyncratic std in [2e-3, 3e-3), roughly matching the whale funds.
+    Prices start at 100 on ``start`` and follow business days.
+    """
+    rng = np.random.default_rng(seed)
+    returns = np.empty((days, funds + 1))
+    mkt = rng.normal(3e-4, 1e-2, days)
+    returns[:, funds] = mkt
+    beta = rng.uniform(0.0, 0.5, funds)
+    noise = rng.uniform(2e-3, 3e-3, funds)
+    returns[:, :funds] = rng.standard_normal((days, funds)) * noise + mkt[:, None] * beta
+    returns[0] = 0.0
+    prices = 100.0 * np.cumprod(1.0 + returns, axis=0)
+
+    index = pd.bdate_range(start, periods=days, name="date")
+    columns = [f"FUND {i:05d}" for i in range(funds)] + [market]
+    return pd.DataFrame(prices, index=index, columns=columns)
+
+
+def write_synthetic_csv(path, funds=4, days=1500, seed=0):
+    """Write ``synthetic_navs`` to ``path`` in the whale_navs.csv layout."""
+    synthetic_navs(funds, days, seed).to_csv(path)
+    return path
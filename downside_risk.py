@@ -0,0 +1,195 @@
+"""Rolling downside risk: downside deviation / Sortino, drawdowns, VaR / CVaR.
+
+The notebook measures risk with the plain standard deviation and Sharpe
+ratio only.  This module adds, for every column of a daily returns frame:
+
+* rolling downside deviation and Sortino ratio (window sums, O(T * N)),
+* running drawdown, running maximum drawdown and drawdown duration,
+* rolling historical VaR and CVaR.
+
+The rolling quantiles avoid re-sorting every window: each column's returns
+are ranked once, and a Fenwick (binary indexed) tree over the ranks counts
+and sums the returns currently in the window.  Adding or dropping a return
+and finding the k-th smallest (with the sum of everything below it) are all
+O(log T) per step, and every step is vectorized across the fund columns.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import NUM_TRADING_DAYS, _window_sums
+
+
+@dataclass
+class DownsideRisk:
+    """Downside risk frames, all indexed like the input returns."""
+
+    downside_deviation: pd.DataFrame
+    sortino: pd.DataFrame
+    drawdown: pd.DataFrame
+    max_drawdown: pd.DataFrame
+    drawdown_duration: pd.DataFrame
+    var: pd.DataFrame
+    cvar: pd.DataFrame
+
+
+# ---
+# Downside deviation / Sortino
+# ---
+
+def rolling_sortino(returns, window=60, target=0.0, num_trading_days=NUM_TRADING_DAYS):
+    """Rolling annualized downside deviation and Sortino ratio.
+
+    The downside deviation is ``sqrt(mean(min(r - target, 0)^2))`` over the
+    window and the Sortino ratio is the annualized mean excess return over the
+    annualized downside deviation.  Returns ``(downside_deviation, sortino)``.
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    excess = values - target
+    shortfall = np.minimum(excess, 0.0)
+    shortfall *= shortfall
+    downside = np.sqrt(_window_sums(shortfall, window) / window * num_trading_days)
+    mean_excess = _window_sums(excess, window) / window * num_trading_days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sortino = mean_excess / downside
+    return (pd.DataFrame(downside, index=returns.index, columns=returns.columns),
+            pd.DataFrame(sortino, index=returns.index, columns=returns.columns))
+
+
+# ---
+# Drawdowns
+# ---
+
+def drawdowns(returns):
+    """Running drawdown, maximum drawdown and drawdown duration.
+
+    The drawdown is the cumulative NAV relative to its running peak minus one
+    (the NAV starts at 1 before the first return), the maximum drawdown is the
+    running minimum of the drawdown and the duration counts the days since the
+    last peak.  The NAV is carried forward over gaps (NaN returns), and all
+    three are NaN before a column's first return.  Returns ``(drawdown,
+    max_drawdown, duration)``.
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    nav = np.where(valid, values, 0.0)
+    nav += 1.0
+    np.cumprod(nav, axis=0, out=nav)
+    peak = np.maximum.accumulate(np.maximum(nav, 1.0), axis=0)
+    drawdown = nav / peak - 1.0
+    max_drawdown = np.minimum.accumulate(drawdown, axis=0)
+
+    # Days since the last row at the running peak (or since the start)
+    days = np.arange(1, len(nav) + 1)[:, None]
+    last_peak = np.maximum.accumulate(np.where(nav >= peak, days, 0), axis=0)
+    duration = days - last_peak
+    started = np.logical_or.accumulate(valid, axis=0)
+    if not started.all():
+        drawdown[~started] = np.nan
+        max_drawdown[~started] = np.nan
+        duration = np.where(started, duration, np.nan)
+
+    def frame(values):
+        return pd.DataFrame(values, index=returns.index, columns=returns.columns)
+    return frame(drawdown), frame(max_drawdown), frame(duration)
+
+
+# ---
+# Rolling VaR / CVaR with a Fenwick tree of ranks
+# ---
+
+class _RankTree:
+    # Fenwick trees of counts and value sums over the ranks of each column,
+    # updated and queried for all columns at once.  Row ``size + 1`` is a
+    # sink: walks past the end of the tree land there, and its infinite
+    # count keeps the k-th smallest search from ever stepping into it
+
+    def __init__(self, sorted_values):
+        self.size, self.columns = sorted_values.shape
+        self.sorted_values = sorted_values.ravel()
+        self.counts = np.zeros((self.size + 2) * self.columns)
+        self.sums = np.zeros((self.size + 2) * self.columns)
+        self.counts[(self.size + 1) * self.columns:] = np.inf
+        self._cols = np.arange(self.columns)
+        self._sink = self.size + 1
+        self._levels = self.size.bit_length()
+
+    def update(self, ranks, sign, valid):
+        # Add (sign=1) or remove (sign=-1) the value at ``ranks`` of each
+        # column where ``valid``; gaps never enter the tree
+        sign = np.where(valid, sign, 0.0)
+        values = np.where(valid, sign * self.sorted_values[ranks * self.columns + self._cols], 0.0)
+        node = ranks + 1
+        for _ in range(self._levels):
+            flat = node * self.columns + self._cols
+            self.counts[flat] += sign
+            self.sums[flat] += values
+            node = np.minimum(node + (node & -node), self._sink)
+
+    def smallest(self, k):
+        # Value of the k-th smallest element (1-based) of each column and the
+        # sum of the k smallest, by binary lifting down the tree
+        position = np.zeros(self.columns, dtype=np.int64)
+        remaining = np.asarray(k, dtype=np.float64).copy()
+        total = np.zeros(self.columns)
+        step = 1 << (self._levels - 1)
+        while step:
+            candidate = np.minimum(position + step, self._sink)
+            flat = candidate * self.columns + self._cols
+            count = self.counts[flat]
+            take = count < remaining
+            position = np.where(take, candidate, position)
+            remaining -= np.where(take, count, 0.0)
+            total += np.where(take, self.sums[flat], 0.0)
+            step >>= 1
+        value = self.sorted_values[position * self.columns + self._cols]
+        return value, total + value
+
+
+def rolling_var_cvar(returns, window=60, level=0.95):
+    """Rolling historical VaR and CVaR at ``level`` over ``window`` rows.
+
+    VaR is the negated ``1 - level`` quantile of the window's returns using
+    the lower order statistic (``rolling(window).quantile(1 - level,
+    interpolation="lower")``); CVaR is the negated mean of the returns at or
+    below it.  Both are positive for losses.  Windows containing a gap (NaN)
+    are NaN, as in pandas and ``rolling_sortino``.  Returns ``(var, cvar)``.
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    dates, columns = values.shape
+    var = np.full(values.shape, np.nan)
+    cvar = np.full(values.shape, np.nan)
+    if dates >= window:
+        # Rank every column once; the tree then works on integer ranks
+        order = np.argsort(values, axis=0, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(dates)[:, None], axis=0)
+        tree = _RankTree(np.take_along_axis(values, order, axis=0))
+
+        k = int(np.floor((window - 1) * (1.0 - level))) + 1
+        k_all = np.full(columns, k)
+        for row in range(dates):
+            tree.update(ranks[row], 1.0, valid[row])
+            if row >= window:
+                tree.update(ranks[row - window], -1.0, valid[row - window])
+            if row >= window - 1:
+                value, total = tree.smallest(k_all)
+                var[row] = -value
+                cvar[row] = -total / k
+        gapped = _window_sums((~valid).astype(np.float64), window) > 0
+        var[gapped] = np.nan
+        cvar[gapped] = np.nan
+    return (pd.DataFrame(var, index=returns.index, columns=returns.columns),
+            pd.DataFrame(cvar, index=returns.index, columns=returns.columns))
+
+
+def downside_risk(returns, window=60, level=0.95, target=0.0,
+                  num_trading_days=NUM_TRADING_DAYS):
+    """All downside metrics of ``returns`` for one window and VaR level."""
+    downside, sortino = rolling_sortino(returns, window, target, num_trading_days)
+    drawdown, max_drawdown, duration = drawdowns(returns)
+    var, cvar = rolling_var_cvar(returns, window, level)
+    return DownsideRisk(downside, sortino, drawdown, max_drawdown, duration, var, cvar)
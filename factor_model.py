@@ -0,0 +1,151 @@
+"""Rolling multi-factor OLS of every fund on the market and extra factors.
+
+``rolling_beta`` regresses each fund on the S&P 500 alone.  Attribution
+needs the fund returns explained by several factor return series at once:
+
+    r_fund = alpha + beta_market * r_market + beta_1 * f_1 + ... + e
+
+``rolling_factor_model`` fits that regression over a sliding window for every
+fund together.  The regressors are shared by all funds, so one window needs
+only the (K x K) Gram matrix ``X'X`` of the regressors and the (K x N) cross
+products ``X'Y`` with the funds; both slide with one rank-one update for the
+entering row and one for the leaving row, and every window is a single solve
+of the K x K system with all N funds as right-hand sides.  Each step is
+O(K * N) instead of O(window * K * N), and the sums are rebuilt from the
+window once per ``window`` steps so rounding drift cannot build up.
+
+Per window and fund the result holds the intercept (daily alpha), one beta per
+regressor, R^2 and the residual volatility ``sqrt(SSR / (window - K))``.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import MARKET
+
+
+@dataclass
+class FactorModel:
+    """Rolling regression results, each (dates x funds) and NaN until a window is full.
+
+    ``betas`` maps every regressor name (the market first, then the factors)
+    to its loadings.
+    """
+
+    alpha: pd.DataFrame
+    betas: dict
+    r_squared: pd.DataFrame
+    residual_vol: pd.DataFrame
+    window: int
+
+    @property
+    def factors(self):
+        return list(self.betas)
+
+    def loadings(self, date=None):
+        """Alpha, betas, R^2 and residual vol on one date (default: the last) per fund."""
+        row = -1 if date is None else self.alpha.index.get_loc(date)
+        columns = {"alpha": self.alpha.iloc[row]}
+        columns.update({name: beta.iloc[row] for name, beta in self.betas.items()})
+        columns["r_squared"] = self.r_squared.iloc[row]
+        columns["residual_vol"] = self.residual_vol.iloc[row]
+        return pd.DataFrame(columns)
+
+
+def _solve(gram, cross):
+    # Coefficients of every fund for one window; a singular Gram matrix
+    # (collinear factors, a flat window) falls back to the pseudo-inverse
+    try:
+        return np.linalg.solve(gram, cross)
+    except np.linalg.LinAlgError:
+        return np.linalg.pinv(gram) @ cross
+
+
+def rolling_factor_model(returns, factors=None, market=MARKET, window=60):
+    """Rolling OLS of every fund in ``returns`` on the market and ``factors``.
+
+    ``returns`` holds the fund columns and the ``market`` column (daily
+    returns, e.g. from ``risk_return_analysis.daily_returns``); ``factors``
+    is an optional DataFrame of extra factor returns by date.  Only dates
+    present in both are used.  Returns a ``FactorModel``.
+    """
+    funds = [name for name in returns.columns if name != market]
+    regressors = returns[[market]]
+    if factors is not None:
+        factors = pd.DataFrame(factors)
+        overlap = [name for name in factors.columns if name in returns.columns]
+        if overlap:
+            raise ValueError(f"factor names clash with return columns: {overlap}")
+        dates = returns.index.intersection(factors.index)
+        regressors = pd.concat([regressors.loc[dates], factors.loc[dates]], axis=1)
+        returns = returns.loc[dates]
+    names = list(regressors.columns)
+
+    # Center both sides on their full-sample means: the slopes, R^2 and
+    # residuals are unchanged and only the intercept is shifted back below
+    y = returns[funds].to_numpy(dtype=np.float64)
+    x = regressors.to_numpy(dtype=np.float64)
+    if not (np.isfinite(y).all() and np.isfinite(x).all()):
+        raise ValueError("returns and factors must not contain missing values")
+    y_center = y.mean(axis=0)
+    x_center = x.mean(axis=0)
+    y = y - y_center
+    x = np.column_stack([np.ones(len(x)), x - x_center])
+
+    dates, count = y.shape
+    params = x.shape[1]
+    if window <= params:
+        raise ValueError(f"window must be longer than the {params} regression parameters")
+    coef = np.full((params, dates, count), np.nan)
+    r_squared = np.full((dates, count), np.nan)
+    residual_vol = np.full((dates, count), np.nan)
+
+    gram = np.zeros((params, params))
+    cross = np.zeros((params, count))
+    sum_y = np.zeros(count)
+    sum_yy = np.zeros(count)
+    for row in range(dates):
+        xr, yr = x[row], y[row]
+        gram += np.outer(xr, xr)
+        cross += np.outer(xr, yr)
+        sum_y += yr
+        sum_yy += yr * yr
+        if row >= window:
+            xo, yo = x[row - window], y[row - window]
+            gram -= np.outer(xo, xo)
+            cross -= np.outer(xo, yo)
+            sum_y -= yo
+            sum_yy -= yo * yo
+        if row < window - 1:
+            continue
+        if (row + 1) % window == 0:
+            # Rebuild the window sums from the rows themselves
+            xs, ys = x[row + 1 - window:row + 1], y[row + 1 - window:row + 1]
+            gram = xs.T @ xs
+            cross = xs.T @ ys
+            sum_y = ys.sum(axis=0)
+            sum_yy = np.einsum("ij,ij->j", ys, ys)
+
+        b = _solve(gram, cross)
+        coef[:, row] = b
+        # At the least-squares solution SSR = y'y - b'X'y
+        ssr = np.maximum(sum_yy - np.einsum("ij,ij->j", b, cross), 0.0)
+        sst = sum_yy - sum_y * sum_y / window
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r_squared[row] = 1.0 - ssr / sst
+        residual_vol[row] = np.sqrt(ssr / (window - params))
+
+    # Intercept in the original units: alpha = c + mean_y - beta . mean_x
+    alpha = coef[0] + y_center - np.einsum("kdn,k->dn", coef[1:], x_center)
+
+    def frame(values):
+        return pd.DataFrame(values, index=returns.index, columns=funds)
+    return FactorModel(
+        alpha=frame(alpha),
+        betas={name: frame(coef[1 + pos]) for pos, name in enumerate(names)},
+        r_squared=frame(r_squared),
+        residual_vol=frame(residual_vol),
+        window=window,
+    )
@@ -0,0 +1,237 @@
+"""Compact fund matrix: one contiguous block plus a slotted name index.
+
+The notebook keeps every intermediate as a float64 DataFrame with object
+column labels, and splits like ``returns.drop(columns="S&P 500")`` copy the
+whole matrix to exclude one column.  ``FundMatrix`` stores a table as
+
+* ``values`` - one C-contiguous (dates x columns) array, float64 or float32,
+  with the market (if any) moved to the last column,
+* ``dates``  - the date index,
+* ``index``  - a ``FundIndex`` mapping column names to positions,
+
+so ``fund_values`` (``values[:, :-1]``), ``market_values`` and ``column(name)``
+are zero-copy views, and ``to_frame`` wraps the block without copying.
+
+Precision
+---------
+``dtype=np.float32`` halves the storage.  Arithmetic is always float64:
+every stored value is rounded once, with a relative error of at most 2**-24
+(about 6e-8), and the reductions (mean, std, rolling windows, beta) convert
+column blocks back to float64 before accumulating.  What matters is *which*
+values are stored in float32:
+
+* float32 returns (``FundMatrix.from_frame(prices).daily_returns(np.float32)``)
+  are within 6e-8 relative of the float64 returns, and std, Sharpe, rolling
+  std and rolling beta stay within about 1e-6 relative of the float64 path;
+* float32 prices lose 2**-24 of every price, so a daily return is only good
+  to about 1.2e-7 absolute (2**-23).  This is an error scale, not a bound:
+  a metric's relative error is roughly 1.2e-7 over the daily volatility of
+  its window, and beta's grows further as beta approaches zero.  On
+  ``whale_navs.csv`` the measured maximum relative errors are 6e-7 (std),
+  3e-6 (Sharpe), 1.7e-4 (21-day rolling std) and 4.5e-4 (60-day rolling
+  beta; 4e-6 absolute).  Compare float32-price results with a relative
+  tolerance of about 1e-3, or prefer float64 prices with float32 returns
+  when the returns feed further analysis.
+"""
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import (
+    MARKET, NUM_TRADING_DAYS, _market_window_stats, _rolling_beta_block, _rolling_std_block,
+)
+
+
+# Columns converted to float64 at a time by the reductions, which bounds the
+# float64 temporaries of a float32 matrix to dates x _COLUMN_BLOCK values
+_COLUMN_BLOCK = 256
+
+
+class FundIndex:
+    """Immutable mapping of column names to positions."""
+
+    __slots__ = ("names", "_positions")
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self._positions = {name: pos for pos, name in enumerate(self.names)}
+        if len(self._positions) != len(self.names):
+            raise ValueError("column names must be unique")
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __getitem__(self, name):
+        return self._positions[name]
+
+    def positions(self, names):
+        """Positions of several names as an int array."""
+        return np.fromiter((self._positions[name] for name in names), dtype=np.intp)
+
+
+class FundMatrix:
+    """Contiguous (dates x columns) block with the market as the last column."""
+
+    __slots__ = ("values", "dates", "index", "market")
+
+    def __init__(self, values, dates, names, market=None):
+        values = np.ascontiguousarray(values)
+        if values.dtype not in (np.float32, np.float64):
+            raise ValueError(f"dtype must be float32 or float64, got {values.dtype}")
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates, name="date")
+        self.index = FundIndex(names)
+        if values.shape != (len(self.dates), len(self.index)):
+            raise ValueError(f"values shape {values.shape} does not match "
+                             f"{len(self.dates)} dates x {len(self.index)} names")
+        if market is not None and self.index.names[-1] != market:
+            raise ValueError(f"market column {market!r} must be the last column")
+        self.market = market
+
+    @classmethod
+    def from_frame(cls, frame, market=MARKET, dtype=np.float64):
+        """Copy a DataFrame into one block, moving ``market`` to the end.
+
+        ``market=None`` (or a frame without that column) keeps the columns as
+        they are.  This is the only copy; the splits below are views.
+        """
+        names = list(frame.columns)
+        if market is not None and market in names:
+            names.remove(market)
+            names.append(market)
+        else:
+            market = None
+        values = np.empty((len(frame), len(names)), dtype=dtype)
+        for start in range(0, len(names), _COLUMN_BLOCK):
+            block = names[start:start + _COLUMN_BLOCK]
+            values[:, start:start + len(block)] = frame[block].to_numpy(dtype=np.float64)
+        return cls(values, frame.index, names, market)
+
+    # ---
+    # Views
+    # ---
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    @property
+    def names(self):
+        return self.index.names
+
+    @property
+    def funds(self):
+        """Names of the fund columns (every column but the market)."""
+        return self.index.names[:-1] if self.market is not None else self.index.names
+
+    @property
+    def fund_values(self):
+        """Zero-copy view of the fund columns."""
+        return self.values[:, :-1] if self.market is not None else self.values
+
+    @property
+    def market_values(self):
+        """Zero-copy view of the market column."""
+        if self.market is None:
+            raise ValueError("matrix has no market column")
+        return self.values[:, -1]
+
+    def column(self, name):
+        """Zero-copy view of one column."""
+        return self.values[:, self.index[name]]
+
+    def select(self, names):
+        """New matrix with a subset of the columns (a copy, like any fancy index)."""
+        names = list(names)
+        market = self.market if self.market in names else None
+        if market is not None:
+            names.remove(market)
+            names.append(market)
+        return FundMatrix(self.values[:, self.index.positions(names)], self.dates, names, market)
+
+    def astype(self, dtype):
+        """Copy in another precision (``self`` if it already has ``dtype``)."""
+        if self.values.dtype == dtype:
+            return self
+        return FundMatrix(self.values.astype(dtype), self.dates, self.index.names, self.market)
+
+    def to_frame(self, include_market=True):
+        """DataFrame wrapping the block (or the fund view) without copying."""
+        if include_market:
+            return pd.DataFrame(self.values, index=self.dates, columns=list(self.index.names),
+                                copy=False)
+        return pd.DataFrame(self.fund_values, index=self.dates, columns=list(self.funds),
+                            copy=False)
+
+    def _column_blocks(self, values=None):
+        # (start, float64 copy) of each block of columns
+        values = self.values if values is None else values
+        for start in range(0, values.shape[1], _COLUMN_BLOCK):
+            yield start, values[:, start:start + _COLUMN_BLOCK].astype(np.float64)
+
+    # ---
+    # Metrics
+    # ---
+
+    def daily_returns(self, dtype=None):
+        """Daily returns (``_returns_block`` semantics) in ``dtype``.
+
+        ``dtype`` defaults to the matrix precision.  Returns are derived in
+        float64 and rounded once on store; rows where any column has no
+        valid return are dropped.
+        """
+        prices = self.values
+        dtype = prices.dtype if dtype is None else dtype
+        returns = np.empty((max(len(prices) - 1, 0), prices.shape[1]), dtype=dtype)
+        for start in range(0, prices.shape[1], _COLUMN_BLOCK):
+            block = prices[:, start:start + _COLUMN_BLOCK].astype(np.float64)
+            ratio = block[1:] / block[:-1]
+            ratio -= 1.0
+            returns[:, start:start + block.shape[1]] = ratio
+        valid = np.isfinite(returns).all(axis=1)
+        dates = self.dates[1:]
+        if not valid.all():
+            returns = returns[valid]
+            dates = dates[valid]
+        return FundMatrix(returns, dates, self.index.names, self.market)
+
+    def risk_metrics(self, num_trading_days=NUM_TRADING_DAYS):
+        """std, ann_std, ann_mean and sharpe of every column (as float64)."""
+        mean = np.empty(len(self.index))
+        std = np.empty(len(self.index))
+        for start, block in self._column_blocks():
+            stop = start + block.shape[1]
+            mean[start:stop] = block.mean(axis=0)
+            std[start:stop] = block.std(axis=0, ddof=1)
+        ann_std = std * np.sqrt(num_trading_days)
+        ann_mean = mean * num_trading_days
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = ann_mean / ann_std
+        return pd.DataFrame({"std": std, "ann_std": ann_std, "ann_mean": ann_mean,
+                             "sharpe": sharpe}, index=list(self.index.names))
+
+    def rolling_std(self, window=21):
+        """Rolling std of every column, in the matrix precision."""
+        out = np.empty_like(self.values)
+        for start, block in self._column_blocks():
+            out[:, start:start + block.shape[1]] = _rolling_std_block(block, window)
+        return FundMatrix(out, self.dates, self.index.names, self.market)
+
+    def rolling_beta(self, window=60):
+        """Rolling beta of every fund against the market, in the matrix precision."""
+        market_stats = _market_window_stats(self.market_values.astype(np.float64), window)
+        funds = self.fund_values
+        out = np.empty(funds.shape, dtype=self.values.dtype)
+        for start, block in self._column_blocks(funds):
+            out[:, start:start + block.shape[1]] = _rolling_beta_block(block, market_stats, window)
+        return FundMatrix(out, self.dates, self.funds)
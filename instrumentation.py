@@ -0,0 +1,183 @@
+"""Opt-in timing and memory instrumentation for the analysis phases.
+
+The pipeline wraps each of the phases listed in the README (Import,
+Performance, Volatility, Risk, Risk-Return, Diversify) in ``phase(...)``.
+While no profiler is enabled ``phase`` returns a shared no-op context
+manager, so the instrumentation costs one global lookup per phase.  Once
+enabled, every phase records wall time, CPU time, the number of rows it
+processed and (optionally) its tracemalloc allocation peak::
+
+    profiler = instrumentation.enable(trace_memory=True)
+    risk_return_analysis.main(plots=False)
+    instrumentation.disable()
+    print(profiler.to_prometheus())
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+PHASES = ("Import", "Performance", "Volatility", "Risk", "Risk-Return", "Diversify")
+
+_active = None
+
+
+class PhaseRecord:
+    """Measurements of one run of one phase."""
+
+    __slots__ = ("name", "wall_s", "cpu_s", "rows", "peak_bytes", "_child_peak")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_bytes = None
+        self._child_peak = 0
+
+    def as_dict(self):
+        return {
+            "phase": self.name,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "rows": self.rows,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+class Profiler:
+    """Collects a ``PhaseRecord`` for every instrumented phase that runs."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._started_tracemalloc = False
+
+    @contextmanager
+    def phase(self, name, rows=None):
+        record = PhaseRecord(name, rows)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        self._stack.append(record)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - wall
+            record.cpu_s = time.process_time() - cpu
+            self._stack.pop()
+            if self.trace_memory:
+                # Peak above the memory in use when the phase started; nested
+                # phases reset the tracemalloc peak, so fold theirs back in
+                peak = max(tracemalloc.get_traced_memory()[1] - base, record._child_peak)
+                record.peak_bytes = peak
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent._child_peak = max(parent._child_peak, peak)
+            self.records.append(record)
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def totals(self):
+        """Per-phase totals: ``{name: {"calls", "wall_s", "cpu_s", "rows", "peak_bytes"}}``."""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record.name, {
+                "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0, "peak_bytes": None})
+            total["calls"] += 1
+            total["wall_s"] += record.wall_s
+            total["cpu_s"] += record.cpu_s
+            total["rows"] += record.rows or 0
+            if record.peak_bytes is not None:
+                total["peak_bytes"] = max(total["peak_bytes"] or 0, record.peak_bytes)
+        return totals
+
+    def to_json(self, indent=2):
+        """Records and per-phase totals as a JSON document."""
+        return json.dumps({
+            "records": [record.as_dict() for record in self.records],
+            "totals": self.totals(),
+        }, indent=indent)
+
+    def to_prometheus(self, prefix="risk_return_phase"):
+        """Per-phase totals in the Prometheus text exposition format."""
+        # Calls, times and rows are cumulative totals that only grow, so they
+        # are counters (``_total``) that rate() applies to; the peak is a gauge
+        metrics = (
+            ("calls", "calls_total", "counter", "Number of times the phase ran."),
+            ("wall_s", "wall_seconds_total", "counter", "Total wall time of the phase in seconds."),
+            ("cpu_s", "cpu_seconds_total", "counter", "Total CPU time of the phase in seconds."),
+            ("rows", "rows_total", "counter", "Total rows processed by the phase."),
+            ("peak_bytes", "peak_bytes", "gauge", "Largest tracemalloc peak of the phase in bytes."),
+        )
+        totals = self.totals()
+        lines = []
+        for key, suffix, kind, help_text in metrics:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for phase_name, total in totals.items():
+                if total[key] is not None:
+                    lines.append(f'{name}{{phase="{phase_name}"}} {total[key]}')
+        return "\n".join(lines) + "\n"
+
+
+class _NullPhase:
+    # Shared no-op context manager returned by phase() while disabled
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name, rows=None):
+    """Context manager measuring one phase if a profiler is enabled.
+
+    Yields the ``PhaseRecord`` (so ``rows`` can be filled in once known), or
+    ``None`` while instrumentation is disabled.
+    """
+    if _active is None:
+        return _NULL_PHASE
+    return _active.phase(name, rows)
+
+
+def enable(trace_memory=False):
+    """Start collecting phase measurements into a new ``Profiler``."""
+    global _active
+    disable()
+    _active = Profiler(trace_memory)
+    _active.start()
+    return _active
+
+
+def disable():
+    """Stop collecting and return the profiler that was active (if any)."""
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def active():
+    """The enabled ``Profiler``, or ``None``."""
+    return _active
@@ -0,0 +1,210 @@
+"""Memoized derived series keyed by data fingerprint and window parameters.
+
+Re-running the Diversify phase with a different ``fund1_selection`` or
+``fund2_selection`` recomputes the market rolling variance and the rolling
+covariance every time, although neither depends on the selected fund.
+``MetricCache`` stores derived values under
+``(fingerprint of the input data, metric, window)`` in an LRU memory tier
+bounded by a byte budget, with an optional on-disk tier (``.npz`` files)
+that survives kernel restarts.
+
+``CachedAnalysis`` builds the notebook's derived series on top of it.  The
+rolling covariance and beta are computed for every fund at once, so picking
+another fund is a cache hit plus a column lookup::
+
+    analysis = CachedAnalysis(rra.load_navs(), cache=MetricCache(disk_dir=".metric_cache"))
+    analysis.beta("BERKSHIRE HATHAWAY INC", window=60)
+    analysis.beta("TIGER GLOBAL MANAGEMENT LLC", window=60)   # cache hit
+"""
+
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import MARKET, daily_returns, rolling_beta, rolling_cov, rolling_std
+
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+def fingerprint(frame):
+    """Content hash of a DataFrame or Series: values, index and labels."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(frame.to_numpy(dtype=np.float64)).tobytes())
+    digest.update(np.ascontiguousarray(_index_values(frame.index)).tobytes())
+    labels = frame.columns if isinstance(frame, pd.DataFrame) else [frame.name]
+    digest.update("\x1f".join(str(label) for label in labels).encode())
+    return digest.hexdigest()
+
+
+def _index_values(index):
+    # Index labels as a NumPy array without object dtype (so no pickles)
+    values = index.to_numpy()
+    return values.astype(str) if values.dtype == object else values
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    return int(np.asarray(value).nbytes)
+
+
+# ---
+# On-disk serialization (npz, no pickles)
+# ---
+
+def _save_value(path, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        arrays = {
+            "kind": "frame" if isinstance(value, pd.DataFrame) else "series",
+            "values": value.to_numpy(),
+            "columns": np.array([str(label) for label in labels]),
+            "index": _index_values(value.index),
+            "index_name": str(value.index.name or ""),
+        }
+    else:
+        arrays = {"kind": "array", "values": np.asarray(value)}
+    tmp = path.with_suffix(".tmp.npz")
+    np.savez(tmp, **arrays)
+    tmp.replace(path)
+
+
+def _load_value(path):
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data["kind"])
+        if kind == "array":
+            return data["values"]
+        index = pd.Index(data["index"], name=str(data["index_name"]) or None)
+        if kind == "frame":
+            return pd.DataFrame(data["values"], index=index, columns=list(data["columns"]))
+        return pd.Series(data["values"], index=index, name=str(data["columns"][0]))
+
+
+class MetricCache:
+    """Two-tier memo cache for derived series.
+
+    The memory tier evicts least recently used entries once their combined
+    size exceeds ``max_bytes``; entries larger than the budget are not kept
+    in memory.  With ``disk_dir`` every computed value is also written to
+    disk and memory misses fall back to it before recomputing.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.disk_hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Value stored under ``key`` (memory, then disk), or ``default``."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+        path = self._disk_path(key)
+        if path is not None and path.exists():
+            value = _load_value(path)
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+        return default
+
+    def put(self, key, value):
+        """Store ``value`` under ``key`` in both tiers."""
+        self._remember(key, value)
+        path = self._disk_path(key)
+        if path is not None:
+            _save_value(path, value)
+
+    def get_or_compute(self, key, compute):
+        """Cached value for ``key``, calling ``compute()`` on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self, disk=False):
+        """Empty the memory tier (and the disk tier if ``disk``)."""
+        self._entries.clear()
+        self.nbytes = 0
+        if disk and self.disk_dir is not None:
+            for path in self.disk_dir.glob("*.npz"):
+                path.unlink()
+
+    def _remember(self, key, value):
+        size = _nbytes(value)
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def _disk_path(self, key):
+        if self.disk_dir is None:
+            return None
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return self.disk_dir / f"{name}.npz"
+
+
+_MISSING = object()
+
+
+class CachedAnalysis:
+    """The notebook's derived series for one price table, memoized.
+
+    Keys are ``(fingerprint, metric, window)``; per-fund results are column
+    lookups into the all-funds frames.
+    """
+
+    def __init__(self, prices, cache=None, market=MARKET):
+        self.prices = prices
+        self.market = market
+        self.cache = cache if cache is not None else MetricCache()
+        self.fingerprint = fingerprint(prices)
+
+    def _cached(self, metric, window, compute):
+        return self.cache.get_or_compute((self.fingerprint, self.market, metric, window), compute)
+
+    def returns(self):
+        """Daily returns (``pct_change().dropna()``)."""
+        return self._cached("returns", None, lambda: daily_returns(self.prices))
+
+    def std_rolling(self, window=21):
+        """Rolling standard deviation of every column."""
+        return self._cached("std_rolling", window, lambda: rolling_std(self.returns(), window))
+
+    def market_var(self, window=60):
+        """Rolling variance of the market column."""
+        return self._cached("market_var", window,
+                            lambda: self.returns()[self.market].rolling(window=window).var())
+
+    def cov(self, fund=None, window=60):
+        """Rolling covariance with the market of ``fund`` (or all funds)."""
+        cov = self._cached("cov", window, lambda: rolling_cov(self.returns(), self.market, window))
+        return cov if fund is None else cov[fund]
+
+    def beta(self, fund=None, window=60):
+        """Rolling beta against the market of ``fund`` (or all funds)."""
+        beta = self._cached("beta", window, lambda: rolling_beta(self.returns(), self.market, window))
+        return beta if fund is None else beta[fund]
@@ -0,0 +1,175 @@
+"""Columnar binary cache for NAV price CSV files.
+
+The first load of a NAV CSV converts it into a cache directory holding
+
+* ``dates.npy``  - the date index as int64 nanoseconds since the epoch
+* ``values.npy`` - the prices as one C-contiguous float64 (dates x columns) matrix
+* ``meta.json``  - column names plus the source file's size, mtime and sha256
+
+Later loads open the ``.npy`` files memory-mapped, so no text or date parsing
+happens and pages are only read as they are touched.  The cache is stale when
+the source size or mtime changes; in that case the source is re-hashed and
+the cache is rebuilt if the content really changed (a touched but identical
+file only refreshes the recorded mtime)::
+
+    prices = load_navs_cached("./Resources/whale_navs.csv")
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+CACHE_VERSION = 1
+DEFAULT_CHUNK_ROWS = 100_000
+_HASH_BLOCK = 1 << 20
+
+
+def default_cache_dir(path):
+    """Cache directory used for ``path`` when none is given."""
+    path = Path(path)
+    return path.parent / ".nav_cache" / path.stem
+
+
+def file_sha256(path):
+    """Hex sha256 of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(cache_dir / "meta.json") as meta_file:
+            return json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    # Write then rename so a crash never leaves a half written meta.json
+    tmp = cache_dir / "meta.json.tmp"
+    with open(tmp, "w") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    os.replace(tmp, cache_dir / "meta.json")
+
+
+def is_fresh(path, cache_dir=None):
+    """Whether the cache for ``path`` matches the current source file.
+
+    A size or mtime mismatch triggers a content hash; if the hash still
+    matches, the recorded mtime is refreshed and the cache is kept.
+    """
+    path = Path(path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir(path)
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    if not all((cache_dir / name).exists() for name in ("dates.npy", "values.npy")):
+        return False
+
+    stat = path.stat()
+    if stat.st_size == meta["size"] and stat.st_mtime_ns == meta["mtime_ns"]:
+        return True
+    if stat.st_size != meta["size"] or file_sha256(path) != meta["sha256"]:
+        return False
+    meta["mtime_ns"] = stat.st_mtime_ns
+    _write_meta(cache_dir, meta)
+    return True
+
+
+def build_cache(path, cache_dir=None, index_col="date", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Convert the CSV at ``path`` into the binary cache, returning its directory.
+
+    The CSV is parsed in ``chunk_rows`` row chunks, so building the cache for
+    a file larger than memory only needs one chunk in memory at a time.
+    """
+    path = Path(path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir(path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    stat = path.stat()
+    sha256 = file_sha256(path)
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        tmp = Path(tmp)
+        columns = None
+        rows = 0
+
+        # Append each parsed chunk as raw bytes, then wrap them in .npy files
+        with open(tmp / "dates.raw", "wb") as dates_raw, open(tmp / "values.raw", "wb") as values_raw:
+            for chunk in pd.read_csv(path, chunksize=chunk_rows):
+                if columns is None:
+                    columns = [name for name in chunk.columns if name != index_col]
+                dates = pd.to_datetime(chunk[index_col]).to_numpy(dtype="datetime64[ns]")
+                dates_raw.write(dates.view(np.int64).tobytes())
+                values = chunk[columns].to_numpy(dtype=np.float64)
+                values_raw.write(np.ascontiguousarray(values).tobytes())
+                rows += len(chunk)
+        if columns is None:
+            raise ValueError(f"{path} has no rows")
+
+        _raw_to_npy(tmp / "dates.raw", tmp / "dates.npy", np.int64, (rows,))
+        _raw_to_npy(tmp / "values.raw", tmp / "values.npy", np.float64, (rows, len(columns)))
+        os.replace(tmp / "dates.npy", cache_dir / "dates.npy")
+        os.replace(tmp / "values.npy", cache_dir / "values.npy")
+
+    _write_meta(cache_dir, {
+        "version": CACHE_VERSION,
+        "source": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+        "index_col": index_col,
+        "columns": columns,
+        "rows": rows,
+    })
+    return cache_dir
+
+
+def _raw_to_npy(raw_path, npy_path, dtype, shape):
+    # Write an .npy header for the final shape followed by the raw bytes
+    with open(npy_path, "wb") as npy_file, open(raw_path, "rb") as raw_file:
+        np.lib.format.write_array_header_1_0(npy_file, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            "fortran_order": False,
+            "shape": shape,
+        })
+        shutil.copyfileobj(raw_file, npy_file, _HASH_BLOCK)
+    os.remove(raw_path)
+
+
+def open_cache(path, cache_dir=None, rebuild=True):
+    """Open the cached arrays for ``path`` as ``(dates, values, columns)``.
+
+    ``dates`` (int64 ns) and ``values`` (float64) are read-only ``np.memmap``
+    arrays.  A missing or stale cache is rebuilt first unless ``rebuild`` is
+    false, in which case a ``FileNotFoundError`` is raised.
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir(path)
+    if not is_fresh(path, cache_dir):
+        if not rebuild:
+            raise FileNotFoundError(f"no fresh NAV cache for {path} in {cache_dir}")
+        build_cache(path, cache_dir)
+    meta = _read_meta(cache_dir)
+    dates = np.load(cache_dir / "dates.npy", mmap_mode="r")
+    values = np.load(cache_dir / "values.npy", mmap_mode="r")
+    return dates, values, meta["columns"]
+
+
+def load_navs_cached(path, cache_dir=None):
+    """Load NAV prices as a DataFrame backed by the memory-mapped cache.
+
+    Drop-in replacement for ``risk_return_analysis.load_navs``; the float64
+    block of the returned frame is the read-only memmap itself (no copy).
+    """
+    dates, values, columns = open_cache(path, cache_dir)
+    index = pd.DatetimeIndex(np.asarray(dates).view("datetime64[ns]"), name="date")
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
@@ -0,0 +1,131 @@
+"""Chunked, out-of-core version of the risk-return pipeline.
+
+``run_chunked`` reads a NAV CSV in row chunks and writes the per-date metrics
+(daily returns, cumulative returns, rolling std and rolling beta) to CSV files
+as it goes, so peak memory is bounded by ``chunk_rows`` x number of columns
+regardless of the length of the history.  Between chunks it only carries
+
+* the last price row, so the first return of the next chunk is correct,
+* the cumulative growth of every column,
+* the last ``window - 1`` returns, so rolling windows span chunk boundaries,
+* the count / mean / sum of squared deviations of the returns, merged chunk
+  by chunk (Chan et al.) for the full-history std, annualized mean and Sharpe.
+
+The summary of the full-history metrics is returned and written to
+``summary.csv`` once the whole file has been read.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import (
+    MARKET,
+    NUM_TRADING_DAYS,
+    _returns_block,
+    rolling_beta,
+    rolling_std,
+)
+
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def iter_nav_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, index_col="date"):
+    """Yield the NAV CSV at ``path`` as DataFrames of ``chunk_rows`` rows."""
+    for chunk in pd.read_csv(Path(path), index_col=index_col, parse_dates=True,
+                             chunksize=chunk_rows):
+        yield chunk
+
+
+class _ChunkWriter:
+    # Append each metric frame to its own CSV, writing the header once
+
+    def __init__(self, out_dir):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._started = set()
+
+    def write(self, name, frame):
+        first = name not in self._started
+        frame.to_csv(self.out_dir / f"{name}.csv", mode="w" if first else "a", header=first)
+        self._started.add(name)
+
+
+def run_chunked(path, out_dir, chunk_rows=DEFAULT_CHUNK_ROWS, market=MARKET,
+                std_window=21, beta_window=60, num_trading_days=NUM_TRADING_DAYS):
+    """Run the risk-return pipeline over ``path`` one chunk at a time.
+
+    Writes ``daily_returns.csv``, ``cum_returns.csv``,
+    ``std_rolling<std_window>.csv``, ``beta_rolling<beta_window>.csv`` and
+    ``summary.csv`` into ``out_dir`` and returns the summary DataFrame
+    (std, ann_std, ann_mean and sharpe per column).
+    """
+    writer = _ChunkWriter(out_dir)
+    tail_rows = max(std_window, beta_window) - 1
+
+    last_prices = None
+    growth = None
+    tail = None
+    count = 0
+    mean = m2 = None
+
+    for prices in iter_nav_chunks(path, chunk_rows):
+        # Prepend the previous chunk's last price row so the first return
+        # of this chunk is computed against it
+        if last_prices is not None:
+            prices = pd.concat([last_prices, prices])
+        last_prices = prices.iloc[-1:]
+        returns, index = _returns_block(prices)
+        if len(returns) == 0:
+            continue
+        columns = prices.columns
+
+        # Cumulative returns continue from the carried growth
+        cum = np.cumprod(returns + 1.0, axis=0)
+        if growth is not None:
+            cum *= growth
+        growth = cum[-1].copy()
+        cum -= 1.0
+
+        # Merge this chunk's count / mean / M2 into the running totals
+        chunk_count = len(returns)
+        chunk_mean = returns.mean(axis=0)
+        chunk_m2 = ((returns - chunk_mean) ** 2).sum(axis=0)
+        if count == 0:
+            mean, m2 = chunk_mean, chunk_m2
+        else:
+            delta = chunk_mean - mean
+            total = count + chunk_count
+            mean = mean + delta * chunk_count / total
+            m2 = m2 + chunk_m2 + delta * delta * count * chunk_count / total
+        count += chunk_count
+
+        # Rolling metrics over the carried tail plus this chunk, keeping
+        # only the rows that belong to this chunk
+        frame = pd.DataFrame(returns, index=index, columns=columns)
+        window_frame = frame if tail is None else pd.concat([tail, frame])
+        skip = len(window_frame) - len(frame)
+        std_rolling = rolling_std(window_frame, window=std_window).iloc[skip:]
+        beta_rolling = rolling_beta(window_frame, market=market, window=beta_window).iloc[skip:]
+        tail = window_frame.iloc[-tail_rows:] if tail_rows else None
+
+        writer.write("daily_returns", frame)
+        writer.write("cum_returns", pd.DataFrame(cum, index=index, columns=columns))
+        writer.write(f"std_rolling{std_window}", std_rolling)
+        writer.write(f"beta_rolling{beta_window}", beta_rolling)
+
+    if count == 0:
+        raise ValueError(f"{path} does not contain enough rows to compute returns")
+
+    std = np.sqrt(m2 / (count - 1)) if count > 1 else np.full_like(mean, np.nan)
+    ann_std = std * np.sqrt(num_trading_days)
+    ann_mean = mean * num_trading_days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = ann_mean / ann_std
+    summary = pd.DataFrame(
+        {"std": std, "ann_std": ann_std, "ann_mean": ann_mean, "sharpe": sharpe},
+        index=columns)
+    summary.to_csv(Path(out_dir) / "summary.csv")
+    return summary
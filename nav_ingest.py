@@ -0,0 +1,247 @@
+"""Concurrent NAV ingestion from many files and HTTP price services.
+
+``load_navs`` reads the single ``Resources/whale_navs.csv`` table.  Here each
+source is one CSV in the same layout (a ``date`` column plus one or more NAV
+columns), given as a local path or an ``http(s)://`` URL, e.g. one file per
+fund or a price service answering ``GET /navs/<fund>.csv``.
+
+``ingest_navs`` runs the sources on one asyncio event loop:
+
+* at most ``concurrency`` sources are in flight at once (a semaphore),
+* HTTP requests are plain asyncio streams, so thousands of slow responses
+  cost no threads, while file reads and the CSV parsing run in a thread pool
+  and never block the loop,
+* every source is parsed into an int64 date array and a float64 block and
+  written into one NaN (dates x columns) matrix at its date positions,
+  instead of concatenating and re-aligning DataFrames.  With a fixed
+  ``dates`` calendar each block is written as soon as it arrives and then
+  dropped, so memory stays at the output matrix plus the sources in flight;
+  without one the union calendar needs every source's dates first, so the
+  parsed blocks are kept until all are in.  A date repeated within a source
+  is an error, as it would be for ``load_navs``::
+
+    prices = ingest_navs(sorted(Path("navs").glob("*.csv")), concurrency=128)
+"""
+
+import asyncio
+import io
+import os
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_CONCURRENCY = 64
+DEFAULT_TIMEOUT = 30.0
+
+
+# ---
+# Fetching and parsing one source
+# ---
+
+def _is_url(source):
+    return isinstance(source, str) and source.startswith(("http://", "https://"))
+
+
+async def _fetch_http(url, timeout):
+    # Minimal HTTP/1.0 GET on asyncio streams: HTTP/1.0 responses are never
+    # chunked and end when the server closes the connection
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    async def get():
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None)
+        try:
+            writer.write(f"GET {target} HTTP/1.0\r\nHost: {parts.netloc}\r\n"
+                         f"Accept: text/csv\r\n\r\n".encode("ascii"))
+            await writer.drain()
+            return await reader.read()
+        finally:
+            writer.close()
+
+    response = await asyncio.wait_for(get(), timeout)
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+    fields = status_line.split(" ", 2)
+    if len(fields) < 2 or fields[1] != "200":
+        raise OSError(status_line or "empty response")
+    return body
+
+
+def _parse_source(data, index_col="date"):
+    # CSV bytes -> (int64 ns dates, float64 values, column names)
+    frame = pd.read_csv(io.BytesIO(data))
+    if index_col not in frame.columns:
+        raise ValueError(f"no {index_col!r} column")
+    columns = [name for name in frame.columns if name != index_col]
+    try:
+        # ISO dates (as written by ``to_csv``) skip the per-file format inference
+        dates = pd.to_datetime(frame[index_col], format="ISO8601")
+    except ValueError:
+        dates = pd.to_datetime(frame[index_col])
+    dates = dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    unique, counts = np.unique(dates, return_counts=True)
+    if len(unique) != len(dates):
+        repeated = unique[counts > 1].view("datetime64[ns]").astype("datetime64[D]")
+        raise ValueError(f"duplicate dates: {[str(date) for date in repeated[:5]]}")
+    return dates, frame[columns].to_numpy(dtype=np.float64), columns
+
+
+async def _load_source(source, semaphore, executor, timeout):
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        try:
+            if _is_url(source):
+                data = await _fetch_http(source, timeout)
+            else:
+                data = await loop.run_in_executor(executor, Path(source).read_bytes)
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise OSError(f"could not read NAV source {source}: {exc}") from exc
+        try:
+            return await loop.run_in_executor(executor, _parse_source, data)
+        except (ValueError, pd.errors.ParserError) as exc:
+            raise ValueError(f"could not parse NAV source {source}: {exc}") from exc
+
+
+# ---
+# Alignment
+# ---
+
+def _calendar_rows(calendar, dates):
+    # Rows of ``dates`` in the sorted ``calendar`` and the mask of dates in it
+    rows = np.searchsorted(calendar, dates)
+    inside = rows < len(calendar)
+    inside[inside] = calendar[rows[inside]] == dates[inside]
+    return rows[inside], inside
+
+
+class _CalendarMatrix:
+    # (columns x dates) NaN buffer for a fixed calendar that sources are
+    # written into as they arrive, in any order.  Rows (= output columns)
+    # are appended in arrival order and permuted in place into source order
+    # at the end; the capacity starts at one column per source and doubles
+    # (in place when the allocator can) if sources carry more
+
+    def __init__(self, calendar, sources):
+        self.calendar = calendar
+        self.buffer = np.full((max(sources, 1), len(calendar)), np.nan)
+        self.used = 0
+        self.keys = []
+        self.names = set()
+
+    def add(self, source, dates, block, names):
+        repeated = sorted(self.names.intersection(names))
+        if repeated:
+            raise ValueError(f"columns provided by more than one source: {repeated}")
+        self.names.update(names)
+        needed = self.used + len(names)
+        if needed > len(self.buffer):
+            capacity = len(self.buffer)
+            self.buffer.resize((max(needed, 2 * capacity), len(self.calendar)), refcheck=False)
+            self.buffer[capacity:] = np.nan
+        rows, inside = _calendar_rows(self.calendar, dates)
+        self.buffer[self.used:needed, rows] = block[inside].T
+        self.keys.extend((source, pos, name) for pos, name in enumerate(names))
+        self.used = needed
+
+    def frame(self):
+        # Permute the rows into source order by following cycles with one
+        # spare row, then shrink the buffer to the rows in use
+        order = sorted(range(self.used), key=lambda row: self.keys[row][:2])
+        done = np.zeros(self.used, dtype=bool)
+        for start in range(self.used):
+            if done[start] or order[start] == start:
+                continue
+            spare = self.buffer[start].copy()
+            row = start
+            while order[row] != start:
+                self.buffer[row] = self.buffer[order[row]]
+                done[row] = True
+                row = order[row]
+            self.buffer[row] = spare
+            done[row] = True
+        self.buffer.resize((self.used, len(self.calendar)), refcheck=False)
+        columns = [self.keys[row][2] for row in order]
+        index = pd.DatetimeIndex(self.calendar.view("datetime64[ns]"), name="date")
+        return pd.DataFrame(self.buffer.T, index=index, columns=columns, copy=False)
+
+
+def _align(parsed):
+    # Allocate the (dates x columns) matrix once and write every source's
+    # block into its columns at its rows of the union calendar
+    columns = [name for _, _, names in parsed for name in names]
+    if len(set(columns)) != len(columns):
+        duplicated = sorted({name for name in columns if columns.count(name) > 1})
+        raise ValueError(f"columns provided by more than one source: {duplicated}")
+    calendar = np.unique(np.concatenate([dates for dates, _, _ in parsed])) if parsed \
+        else np.empty(0, dtype=np.int64)
+
+    values = np.full((len(calendar), len(columns)), np.nan)
+    start = 0
+    for dates, block, names in parsed:
+        rows, inside = _calendar_rows(calendar, dates)
+        values[rows, start:start + len(names)] = block[inside]
+        start += len(names)
+    index = pd.DatetimeIndex(calendar.view("datetime64[ns]"), name="date")
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+# ---
+# Entry points
+# ---
+
+async def ingest_navs_async(sources, concurrency=DEFAULT_CONCURRENCY, dates=None,
+                            timeout=DEFAULT_TIMEOUT, workers=None):
+    """Read every source concurrently and align them into one price DataFrame.
+
+    ``sources`` are paths or ``http(s)://`` URLs of CSVs with a ``date``
+    column; the columns keep the source order.  ``dates`` fixes the calendar
+    (rows outside it are dropped) and every source is written into the
+    result as it arrives; otherwise it is the union of all source dates.
+    Missing prices are NaN.  ``workers`` sizes the read / parse
+    thread pool.  The first failing source raises ``OSError`` (read) or
+    ``ValueError`` (parse) naming it.
+    """
+    sources = list(sources)
+    matrix = None
+    if dates is not None:
+        calendar = np.unique(pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]").view(np.int64))
+        matrix = _CalendarMatrix(calendar, len(sources))
+
+    async def load(position, source):
+        parsed = await _load_source(source, semaphore, executor, timeout)
+        if matrix is None:
+            return parsed
+        # Written on the event loop thread, so no two writes overlap
+        matrix.add(position, *parsed)
+        return None
+
+    semaphore = asyncio.Semaphore(concurrency)
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tasks = [asyncio.ensure_future(load(position, source))
+                 for position, source in enumerate(sources)]
+        try:
+            parsed = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    if matrix is not None:
+        return matrix.frame()
+    return _align(parsed)
+
+
+def ingest_navs(sources, concurrency=DEFAULT_CONCURRENCY, dates=None,
+                timeout=DEFAULT_TIMEOUT, workers=None):
+    """Synchronous wrapper around ``ingest_navs_async`` (runs its own event loop)."""
+    return asyncio.run(ingest_navs_async(list(sources), concurrency, dates, timeout, workers))
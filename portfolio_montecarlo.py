@@ -0,0 +1,180 @@
+"""Monte Carlo simulation of weighted fund portfolio NAV paths.
+
+The notebook only looks backwards (``(1 + whale_navs_daily_returns).cumprod()
+- 1`` on history).  ``simulate_portfolio`` projects a weighted portfolio of
+the funds forward by drawing daily returns either
+
+* ``"bootstrap"`` - whole historical dates, so the cross-fund correlation and
+  the fat tails of the history are kept, or
+* ``"normal"``    - multivariate normal returns with the sample mean and
+  covariance (correlated through its Cholesky factor).
+
+With ``rebalance=True`` (constant weights every day) the portfolio return on
+a drawn date is just ``w'r``: bootstrap draws index the historical portfolio
+returns and normal draws have mean ``w'mu`` and variance ``w'Sw``, so the cost
+does not depend on the number of funds.  With ``rebalance=False`` (buy and
+hold) each fund's path is simulated and the weights drift.
+
+Paths are simulated in batches of ``batch_size`` so memory stays bounded.
+Every batch has its own RNG stream spawned from one ``SeedSequence``, so a
+given ``seed`` reproduces the same paths whether the batches run in this
+process or across ``workers`` processes.  The result holds percentile cones of
+the cumulative return, VaR / CVaR of the horizon return and the distribution
+of the maximum drawdown.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import MARKET
+
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+MAX_BATCH_BYTES = 256 * 2**20
+
+
+@dataclass
+class SimulationResult:
+    """Summary of a Monte Carlo run.
+
+    ``cone`` is a (day x percentile) DataFrame of cumulative returns;
+    ``final_returns`` and ``max_drawdowns`` hold one value per path;
+    ``var`` / ``cvar`` are positive losses of the horizon return at
+    ``var_level``.
+    """
+
+    cone: pd.DataFrame
+    final_returns: np.ndarray
+    max_drawdowns: np.ndarray
+    var: float
+    cvar: float
+    var_level: float
+
+    def drawdown_percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """Percentiles of the maximum drawdown (negative numbers)."""
+        return pd.Series(np.percentile(self.max_drawdowns, percentiles), index=list(percentiles))
+
+
+# ---
+# Batch simulation (runs in this process or in pool workers)
+# ---
+
+_worker_model = None
+
+
+def _init_worker(model):
+    # Pool initializer: receive the model once per worker, not once per batch
+    global _worker_model
+    _worker_model = model
+
+
+def _simulate_batch(task, model=None):
+    # Simulate one batch of paths; returns the cumulative returns at the cone
+    # days (float32), the horizon returns and the max drawdowns
+    seed, paths = task
+    model = model if model is not None else _worker_model
+    rng = np.random.default_rng(seed)
+    days = model["days"]
+
+    if model["rebalance"]:
+        if model["method"] == "bootstrap":
+            history = model["portfolio_history"]
+            daily = history[rng.integers(0, len(history), size=(paths, days))]
+        else:
+            daily = rng.normal(model["portfolio_mu"], model["portfolio_sigma"], size=(paths, days))
+        nav = np.cumprod(1.0 + daily, axis=1)
+    else:
+        weights = model["weights"]
+        if model["method"] == "bootstrap":
+            history = model["history"]
+            fund_daily = history[rng.integers(0, len(history), size=(paths, days))]
+        else:
+            noise = rng.standard_normal((paths, days, len(weights)))
+            fund_daily = noise @ model["chol"].T
+            fund_daily += model["mu"]
+        nav = np.cumprod(1.0 + fund_daily, axis=1) @ weights
+
+    drawdowns = nav / np.maximum.accumulate(np.maximum(nav, 1.0), axis=1) - 1.0
+    cum = nav[:, model["cone_days"]] - 1.0
+    return cum.astype(np.float32), nav[:, -1] - 1.0, np.minimum(drawdowns.min(axis=1), 0.0)
+
+
+# ---
+# Entry point
+# ---
+
+def simulate_portfolio(returns, weights, days=252, paths=100_000, method="bootstrap",
+                       rebalance=True, batch_size=10_000, seed=0, workers=1,
+                       percentiles=DEFAULT_PERCENTILES, var_level=0.95, cone_step=1,
+                       market=MARKET):
+    """Simulate ``paths`` NAV paths of ``days`` days for a weighted fund portfolio.
+
+    ``returns`` are historical daily returns (the ``market`` column, if
+    present, is ignored unless it is given a weight); ``weights`` is a Series
+    keyed by fund or an array in column order, normalized to sum to one.
+    ``cone_step`` keeps every n-th day in the percentile cone.  Buy-and-hold
+    batches are capped so their per-fund returns fit in ``MAX_BATCH_BYTES``.
+    """
+    if method not in ("bootstrap", "normal"):
+        raise ValueError(f"unknown method {method!r}, expected 'bootstrap' or 'normal'")
+    if isinstance(weights, pd.Series):
+        columns = list(weights.index)
+        weights = weights.to_numpy(dtype=np.float64)
+    else:
+        columns = [name for name in returns.columns if name != market]
+        weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    history = returns[columns].to_numpy(dtype=np.float64)
+
+    # The last day is always in the cone, also when cone_step exceeds days
+    cone_days = np.arange(cone_step - 1, days, cone_step)
+    if cone_days.size == 0 or cone_days[-1] != days - 1:
+        cone_days = np.append(cone_days, days - 1)
+    model = {"method": method, "rebalance": rebalance, "days": days, "cone_days": cone_days}
+    if rebalance:
+        portfolio_history = history @ weights
+        model.update(
+            portfolio_history=portfolio_history,
+            portfolio_mu=float(portfolio_history.mean()),
+            portfolio_sigma=float(portfolio_history.std(ddof=1)),
+        )
+    else:
+        model.update(weights=weights, history=history, mu=history.mean(axis=0))
+        if method == "normal":
+            cov = np.atleast_2d(np.cov(history, rowvar=False))
+            model["chol"] = np.linalg.cholesky(cov + 1e-14 * np.eye(len(weights)))
+
+    # Buy-and-hold batches hold (paths x days x funds) returns, so shrink the
+    # batch to keep that block under MAX_BATCH_BYTES
+    if not rebalance:
+        batch_size = max(1, min(batch_size, MAX_BATCH_BYTES // (8 * days * len(weights))))
+
+    # One independent, reproducible RNG stream per batch
+    sizes = [min(batch_size, paths - start) for start in range(0, paths, batch_size)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = list(zip(streams, sizes))
+    if workers == 1:
+        batches = [_simulate_batch(task, model) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model,)) as pool:
+            batches = list(pool.map(_simulate_batch, tasks))
+
+    cum = np.concatenate([batch[0] for batch in batches])
+    final_returns = np.concatenate([batch[1] for batch in batches])
+    max_drawdowns = np.concatenate([batch[2] for batch in batches])
+
+    cone = pd.DataFrame(np.percentile(cum, percentiles, axis=0).T,
+                        index=pd.Index(cone_days + 1, name="day"), columns=list(percentiles))
+    cutoff = np.quantile(final_returns, 1.0 - var_level)
+    return SimulationResult(
+        cone=cone,
+        final_returns=final_returns,
+        max_drawdowns=max_drawdowns,
+        var=float(-cutoff),
+        cvar=float(-final_returns[final_returns <= cutoff].mean()),
+        var_level=var_level,
+    )
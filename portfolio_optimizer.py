@@ -0,0 +1,338 @@
+"""Mean-variance optimization for the "Diversify the Portfolio" phase.
+
+Instead of picking ``fund1_selection`` / ``fund2_selection`` by hand from the
+Sharpe ratios and betas, ``optimize_portfolio`` builds the efficient frontier
+and the maximum-Sharpe portfolio from the fund daily returns
+(``whale_navs_daily_returns_funds``):
+
+* the covariance is estimated with Ledoit-Wolf shrinkage towards a scaled
+  identity, which keeps it well conditioned when there are thousands of funds
+  and only a few years of daily returns;
+* without position limits the frontier is exact and closed form: one
+  Cholesky factorization and a single solve against ``[mu, 1]`` give every
+  target return at once;
+* long-only frontiers (weights >= 0, summing to 1) solve
+  ``min 1/2 w'Sw - t mu'w`` for a grid of risk tolerances ``t`` with
+  accelerated projected gradient (FISTA).  All frontier points iterate
+  together as one (funds x points) matrix, so each step is a single matrix
+  product, restricted to the rows of the covariance where the (sparse)
+  iterates have weight.  Each point is warm-started from the projection of the matching
+  unconstrained solution, or from a previous frontier's weights, and the
+  long-only tangency portfolio is warm-started from the best frontier point.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import MARKET, NUM_TRADING_DAYS, daily_returns
+
+
+@dataclass
+class Frontier:
+    """Efficient frontier and maximum-Sharpe portfolio (annualized figures).
+
+    ``weights`` has one row per frontier point and one column per fund;
+    ``points`` holds each point's ann_return, ann_volatility and sharpe.
+    """
+
+    weights: pd.DataFrame
+    points: pd.DataFrame
+    max_sharpe_weights: pd.Series
+    max_sharpe: float
+    shrinkage: float
+    long_only: bool
+
+
+# ---
+# Covariance estimation
+# ---
+
+def shrunk_covariance(returns):
+    """Ledoit-Wolf shrinkage covariance of a (dates x funds) return block.
+
+    Returns ``(cov, shrinkage)`` where ``cov = shrinkage * m * I +
+    (1 - shrinkage) * S``, ``S`` is the sample covariance (1 / T
+    normalization) and ``m`` its average variance.  Costs O(T * N^2) for the
+    sample covariance and O(T * N + N^2) for the shrinkage intensity.
+    """
+    values = np.asarray(returns, dtype=np.float64)
+    dates, funds = values.shape
+    centered = values - values.mean(axis=0)
+    sample = centered.T @ centered / dates
+    mean_var = np.trace(sample) / funds
+
+    # d^2 = ||S - m I||^2 and b^2 = 1 / T^2 * sum_t ||x_t x_t' - S||^2 with the
+    # Frobenius norm scaled by 1 / N, using sum_t ||x_t x_t' - S||^2 =
+    # sum_t ||x_t||^4 - T ||S||^2
+    sample_norm = np.sum(sample * sample)
+    d2 = (sample_norm - 2 * mean_var * np.trace(sample) + funds * mean_var ** 2) / funds
+    row_norms = np.einsum("ij,ij->i", centered, centered)
+    b2 = (np.sum(row_norms ** 2) - dates * sample_norm) / (funds * dates ** 2)
+    shrinkage = 0.0 if d2 <= 0 else float(min(max(b2, 0.0), d2) / d2)
+
+    cov = sample * (1.0 - shrinkage)
+    cov[np.diag_indices(funds)] += shrinkage * mean_var
+    return cov, shrinkage
+
+
+# ---
+# Unconstrained frontier (closed form)
+# ---
+
+def _solve_mu_one(mu, cov):
+    # Solve cov @ [x_mu, x_one] = [mu, 1] with one Cholesky factorization
+    chol = np.linalg.cholesky(cov)
+    rhs = np.column_stack([mu, np.ones_like(mu)])
+    return np.linalg.solve(chol.T, np.linalg.solve(chol, rhs))
+
+
+def _unconstrained_tolerance_weights(mu, solved, tolerances):
+    # w(t) = t * S^-1 mu + gamma(t) * S^-1 1 with gamma chosen so sum(w) = 1
+    x_mu, x_one = solved[:, 0], solved[:, 1]
+    gamma = (1.0 - tolerances * x_mu.sum()) / x_one.sum()
+    return np.outer(x_mu, tolerances) + np.outer(x_one, gamma)
+
+
+def _unconstrained_frontier(mu, cov, n_points):
+    # Minimum-variance portfolios for evenly spaced target returns between
+    # the global minimum-variance return and the largest fund return
+    solved = _solve_mu_one(mu, cov)
+    x_mu, x_one = solved[:, 0], solved[:, 1]
+    a, b, c = mu @ x_mu, x_one.sum(), mu @ x_one
+    det = a * b - c * c
+    targets = np.linspace(c / b, max(mu.max(), c / b), n_points)
+    lam = (b * targets - c) / det
+    gamma = (a - c * targets) / det
+    return np.outer(x_mu, lam) + np.outer(x_one, gamma)
+
+
+# ---
+# Long-only frontier (batched projected gradient)
+# ---
+
+def project_simplex(weights):
+    """Euclidean projection of each column of ``weights`` onto the simplex."""
+    weights = np.asarray(weights, dtype=np.float64)
+    single = weights.ndim == 1
+    if single:
+        weights = weights[:, None]
+    n = weights.shape[0]
+    ordered = -np.sort(-weights, axis=0)
+    cumulative = np.cumsum(ordered, axis=0) - 1.0
+    ranks = np.arange(1, n + 1)[:, None]
+    support = ordered - cumulative / ranks > 0
+    count = n - np.argmax(support[::-1], axis=0)
+    theta = cumulative[count - 1, np.arange(weights.shape[1])] / count
+    projected = np.maximum(weights - theta, 0.0)
+    return projected[:, 0] if single else projected
+
+
+def _largest_eigenvalue(cov, iterations=100, tol=1e-10):
+    # Power iteration; cheaper than a full eigendecomposition for large N
+    vector = np.full(cov.shape[0], 1.0 / np.sqrt(cov.shape[0]))
+    value = 0.0
+    for _ in range(iterations):
+        product = cov @ vector
+        new_value = np.linalg.norm(product)
+        if new_value == 0:
+            return 0.0
+        vector = product / new_value
+        if abs(new_value - value) <= tol * new_value:
+            break
+        value = new_value
+    return new_value
+
+
+def _project_return_constraint(values, excess):
+    # Euclidean projection of each column onto {y >= 0, excess'y = 1}:
+    # y = max(v - theta * excess, 0).  excess'y is piecewise linear and
+    # non-increasing in theta with breakpoints v_i / excess_i, so sorting the
+    # breakpoints gives the segment containing the root exactly.  All
+    # columns are projected at once along axis 0
+    values = np.asarray(values, dtype=np.float64)
+    projected = np.maximum(values, 0.0)
+    nonzero = excess != 0
+    a = excess[nonzero][:, None]
+    v = values[nonzero]
+    ratios = v / a
+    order = np.argsort(ratios, axis=0)
+    breaks = np.take_along_axis(ratios, order, axis=0)
+    a_s = a[order, 0]
+    v_s = np.take_along_axis(v, order, axis=0)
+    pos_s = a_s > 0
+
+    # On segment j (between breaks j - 1 and j) the active entries are the
+    # positive-excess ones with index >= j and the negative ones below j
+    def prefix(terms):
+        out = np.zeros((terms.shape[0] + 1, terms.shape[1]))
+        np.cumsum(terms, axis=0, out=out[1:])
+        return out
+
+    av, aa = a_s * v_s, a_s * a_s
+    pos_av, pos_aa = prefix(np.where(pos_s, av, 0.0)), prefix(np.where(pos_s, aa, 0.0))
+    neg_av, neg_aa = prefix(np.where(pos_s, 0.0, av)), prefix(np.where(pos_s, 0.0, aa))
+    total_av = pos_av[-1] - pos_av + neg_av
+    total_aa = pos_aa[-1] - pos_aa + neg_aa
+    with np.errstate(divide="ignore", invalid="ignore"):
+        theta = (total_av - 1.0) / total_aa
+    edge = np.full((1, breaks.shape[1]), np.inf)
+    lower = np.concatenate([-edge, breaks])
+    upper = np.concatenate([breaks, edge])
+    fits = (total_aa > 0) & (theta >= lower) & (theta <= upper)
+    root = theta[np.argmax(fits, axis=0), np.arange(theta.shape[1])]
+    projected[nonzero] = np.maximum(v - root * a, 0.0)
+    return projected
+
+
+def _long_only_solve(cov, linear, init, lipschitz, project=project_simplex,
+                     max_iter=10000, tol=1e-9):
+    # FISTA on min 1/2 w'Sw - linear'w over the set ``project`` maps onto,
+    # one problem per column.  The momentum of a column is reset whenever it
+    # points against the last step (adaptive restart), which gives linear
+    # convergence on these strongly convex problems; columns stop updating
+    # once their step is below tol
+    step = 1.0 / lipschitz
+    weights = project(np.array(init, dtype=np.float64))
+    momentum = weights.copy()
+    scale = np.ones(weights.shape[1])
+    active = np.arange(weights.shape[1])
+    for _ in range(max_iter):
+        current = momentum[:, active]
+        # Projected iterates are sparse: multiply only the rows of cov (it is
+        # symmetric) where some column has a nonzero weight
+        support = np.flatnonzero(current.any(axis=1))
+        if support.size < cov.shape[0] // 2:
+            gradient = cov[support].T @ current[support] - linear[:, active]
+        else:
+            gradient = cov @ current - linear[:, active]
+        new_weights = project(current - step * gradient)
+        delta = new_weights - weights[:, active]
+        restart = np.einsum("ij,ij->j", current - new_weights, delta) > 0
+        new_scale = (1.0 + np.sqrt(1.0 + 4.0 * scale[active] ** 2)) / 2.0
+        factor = np.where(restart, 0.0, (scale[active] - 1.0) / new_scale)
+        scale[active] = np.where(restart, 1.0, new_scale)
+        weights[:, active] = new_weights
+        momentum[:, active] = new_weights + factor * delta
+        active = active[np.max(np.abs(delta), axis=0) > tol]
+        if active.size == 0:
+            break
+    return weights
+
+
+def _max_tolerance(mu, cov):
+    # Smallest risk tolerance at which the long-only solution is the single
+    # highest-return fund j: t >= (S_jj - S_ij) / (mu_j - mu_i) for mu_i < mu_j
+    top = int(np.argmax(mu))
+    gap = mu[top] - mu
+    lower = gap > 0
+    if not lower.any():
+        return 0.0
+    return float(np.max((cov[top, top] - cov[top, lower]) / gap[lower]))
+
+
+# ---
+# Entry points
+# ---
+
+def efficient_frontier(mu, cov, n_points=50, long_only=True, init=None):
+    """Efficient frontier weights as a (funds x n_points) array.
+
+    ``mu`` and ``cov`` are daily mean returns and covariance.  Unconstrained
+    frontiers use exact, evenly spaced target returns; long-only frontiers use
+    evenly spaced risk tolerances from the minimum-variance portfolio up to
+    the highest-return fund.  ``init`` (funds x n_points) warm-starts the
+    long-only solver, e.g. with the previous rebalance's frontier.
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    cov = np.asarray(cov, dtype=np.float64)
+    if not long_only:
+        return _unconstrained_frontier(mu, cov, n_points)
+
+    tolerances = np.linspace(0.0, _max_tolerance(mu, cov), n_points)
+    if init is None:
+        init = _unconstrained_tolerance_weights(mu, _solve_mu_one(mu, cov), tolerances)
+    return _long_only_solve(cov, np.outer(mu, tolerances), init, _largest_eigenvalue(cov))
+
+
+def max_sharpe_weights(mu, cov, long_only=True, risk_free=0.0, frontier=None):
+    """Weights of the maximum-Sharpe (tangency) portfolio.
+
+    Unconstrained: ``S^-1 (mu - rf)`` normalized to sum to one.  When its
+    sum is not positive (e.g. every fund trails ``risk_free``) that
+    normalization would flip the sign and give the minimum-Sharpe
+    portfolio, so the long-only solution is returned instead.  Long-only:
+    ``min y'Sy`` subject to ``(mu - rf)'y = 1, y >= 0`` solved with the same
+    projected gradient, warm-started from the best frontier point, and
+    rescaled to ``w = y / sum(y)``.  If no fund beats ``risk_free`` the best
+    frontier point is returned.
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    cov = np.asarray(cov, dtype=np.float64)
+    excess = mu - risk_free
+    if not long_only:
+        solved = _solve_mu_one(excess, cov)[:, 0]
+        if solved.sum() > 0:
+            return solved / solved.sum()
+        frontier = None
+
+    if frontier is None:
+        frontier = efficient_frontier(mu, cov, long_only=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = (excess @ frontier) / np.sqrt(np.sum(frontier * (cov @ frontier), axis=0))
+    best = frontier[:, int(np.nanargmax(ratios))]
+    if excess.max() <= 0 or excess @ best <= 0:
+        return best
+
+    init = (best / (excess @ best))[:, None]
+    scaled = _long_only_solve(cov, np.zeros_like(init), init, _largest_eigenvalue(cov),
+                              project=lambda values: _project_return_constraint(values, excess))
+    return scaled[:, 0] / scaled[:, 0].sum()
+
+
+def _annualize(weights, mu, cov, num_trading_days):
+    # Annualized return and volatility of each column of a (funds x k) block
+    ann_return = (mu @ weights) * num_trading_days
+    ann_vol = np.sqrt(np.sum(weights * (cov @ weights), axis=0) * num_trading_days)
+    return ann_return, ann_vol
+
+
+def optimize_portfolio(prices=None, returns=None, market=MARKET, n_points=50, long_only=True,
+                       shrink=True, risk_free=0.0, num_trading_days=NUM_TRADING_DAYS, init=None):
+    """Efficient frontier and max-Sharpe portfolio of the fund columns.
+
+    Pass NAV ``prices`` (returns are derived) or daily ``returns``; the
+    ``market`` column is excluded from the investable funds.  ``risk_free``
+    is an annual rate.
+    """
+    if returns is None:
+        returns = daily_returns(prices)
+    funds = returns.drop(columns=market, errors="ignore")
+    values = funds.to_numpy(dtype=np.float64)
+    mu = values.mean(axis=0)
+    if shrink:
+        cov, shrinkage = shrunk_covariance(values)
+    else:
+        cov, shrinkage = np.cov(values, rowvar=False), 0.0
+
+    weights = efficient_frontier(mu, cov, n_points, long_only, init)
+    tangency = max_sharpe_weights(mu, cov, long_only, risk_free / num_trading_days,
+                                  frontier=weights if long_only else None)
+
+    ann_return, ann_vol = _annualize(weights, mu, cov, num_trading_days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        points = pd.DataFrame({
+            "ann_return": ann_return,
+            "ann_volatility": ann_vol,
+            "sharpe": (ann_return - risk_free) / ann_vol,
+        })
+    tangency_return, tangency_vol = _annualize(tangency[:, None], mu, cov, num_trading_days)
+    return Frontier(
+        weights=pd.DataFrame(weights.T, columns=funds.columns),
+        points=points,
+        max_sharpe_weights=pd.Series(tangency, index=funds.columns),
+        max_sharpe=float((tangency_return[0] - risk_free) / tangency_vol[0]),
+        shrinkage=shrinkage,
+        long_only=long_only,
+    )
@@ -0,0 +1,283 @@
+"""Date-range queries over prefix sums of the daily returns.
+
+Questions like "beta of Tiger Global between March and June 2020" or "Sharpe
+over the last six months" otherwise mean slicing the prices and re-running
+the analysis.  ``RangeQueryIndex`` precomputes, once, the prefix sums (with a
+leading zero row) of the centered returns, of their squares and of their
+cross products with the market.  Any ``[start, end]`` range is then two date
+lookups (binary search) and one difference of prefix rows, so mean, std,
+Sharpe, covariance and beta cost O(1) per fund whatever the range length::
+
+    index = RangeQueryIndex.from_prices(rra.load_navs())
+    index.query("2020-03-01", "2020-06-30", ["TIGER GLOBAL MANAGEMENT LLC"])
+    index.last(months=6)["sharpe"]
+
+The index can be saved to / loaded from an ``.npz`` file, and ``serve``
+answers the same queries as JSON over a small local HTTP endpoint::
+
+    python range_query.py Resources/whale_navs.csv --port 8765
+    curl "http://127.0.0.1:8765/query?start=2020-01-01&end=2020-06-30&fund=S%26P%20500"
+"""
+
+import argparse
+import json
+import math
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import risk_return_analysis as rra
+from risk_return_analysis import MARKET, NUM_TRADING_DAYS
+
+
+def _prefix(block):
+    # Cumulative sums with a leading zero row: the sum over rows [i, j) is
+    # prefix[j] - prefix[i]
+    prefix = np.zeros((block.shape[0] + 1, block.shape[1]))
+    np.cumsum(block, axis=0, out=prefix[1:])
+    return prefix
+
+
+class RangeQueryIndex:
+    """Prefix sums of daily returns answering range queries in O(1) per fund."""
+
+    def __init__(self, returns, market=MARKET, num_trading_days=NUM_TRADING_DAYS):
+        values = returns.to_numpy(dtype=np.float64)
+        if not np.isfinite(values).all():
+            raise ValueError("returns must not contain missing values "
+                             "(derive them with risk_return_analysis.daily_returns)")
+        self.columns = list(returns.columns)
+        if market not in self.columns:
+            raise ValueError(f"market column {market!r} not in returns")
+        self.market = market
+        self.num_trading_days = num_trading_days
+        self.dates = pd.DatetimeIndex(returns.index, name="date").as_unit("ns")
+        self._positions = {name: pos for pos, name in enumerate(self.columns)}
+
+        # The moments are shift invariant, so center every column on its
+        # full-sample mean to keep the prefix sums small; the mean adds it back
+        self.center = values.mean(axis=0) if len(values) else np.zeros(values.shape[1])
+        centered = values - self.center
+        mkt = centered[:, self._positions[market]]
+        self.sum_x = _prefix(centered)
+        self.sum_xx = _prefix(centered * centered)
+        self.sum_xm = _prefix(centered * mkt[:, None])
+
+    @classmethod
+    def from_prices(cls, prices, **kwargs):
+        """Build the index from NAV prices (daily returns are derived first)."""
+        return cls(rra.daily_returns(prices), **kwargs)
+
+    # ---
+    # Queries
+    # ---
+
+    def rows(self, start=None, end=None):
+        """Row range ``[first, stop)`` of the dates in ``[start, end]`` (inclusive)."""
+        first = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), "left"))
+        stop = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), "right"))
+        return first, max(first, stop)
+
+    def _select(self, funds):
+        if funds is None:
+            return list(self.columns), slice(None)
+        if isinstance(funds, str):
+            funds = [funds]
+        funds = list(funds)
+        unknown = [name for name in funds if name not in self._positions]
+        if unknown:
+            raise KeyError(f"unknown funds: {unknown}")
+        return funds, np.array([self._positions[name] for name in funds], dtype=np.intp)
+
+    def query(self, start=None, end=None, funds=None):
+        """Metrics of ``funds`` (default: every column) over ``[start, end]``.
+
+        Returns a DataFrame indexed by fund with the number of observations,
+        the daily mean and std, annualized mean / std, Sharpe ratio and the
+        covariance / beta against the market.  Ranges with fewer than two
+        returns give NaN moments.
+        """
+        first, stop = self.rows(start, end)
+        return self._query_rows(first, stop, funds)
+
+    def _query_rows(self, first, stop, funds):
+        # Metrics over the returns in rows [first, stop)
+        funds, cols = self._select(funds)
+        n = stop - first
+        ddof = n - 1 if n > 1 else np.nan
+        mkt = self._positions[self.market]
+
+        sum_x = self.sum_x[stop, cols] - self.sum_x[first, cols]
+        sum_xx = self.sum_xx[stop, cols] - self.sum_xx[first, cols]
+        sum_xm = self.sum_xm[stop, cols] - self.sum_xm[first, cols]
+        sum_m = self.sum_x[stop, mkt] - self.sum_x[first, mkt]
+        sum_mm = self.sum_xx[stop, mkt] - self.sum_xx[first, mkt]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = sum_x / n + self.center[cols]
+            var = np.maximum(sum_xx - sum_x * sum_x / n, 0.0) / ddof
+            cov = (sum_xm - sum_x * sum_m / n) / ddof
+            var_m = (sum_mm - sum_m * sum_m / n) / ddof
+            std = np.sqrt(var)
+            ann_mean = mean * self.num_trading_days
+            ann_std = std * np.sqrt(self.num_trading_days)
+            frame = pd.DataFrame({
+                "observations": np.full(len(funds), n),
+                "mean": mean,
+                "std": std,
+                "ann_mean": ann_mean,
+                "ann_std": ann_std,
+                "sharpe": ann_mean / ann_std,
+                "cov": cov,
+                "beta": cov / var_m,
+            }, index=funds)
+        return frame
+
+    def last(self, months=None, days=None, funds=None, end=None):
+        """``query`` over the trailing ``months`` / ``days`` up to ``end`` (default: last date)."""
+        end = self.dates[-1] if end is None else pd.Timestamp(end)
+        if months is not None:
+            start = end - pd.DateOffset(months=months)
+        elif days is not None:
+            start = end - pd.Timedelta(days=days)
+        else:
+            raise ValueError("give months or days")
+        # The range is (start, end]: six months back from June 30 starts July 1
+        first = int(self.dates.searchsorted(start, "right"))
+        stop = int(self.dates.searchsorted(end, "right"))
+        return self._query_rows(first, max(first, stop), funds)
+
+    def beta(self, fund, start=None, end=None):
+        """Beta of one fund against the market over ``[start, end]``."""
+        return float(self.query(start, end, [fund])["beta"].iloc[0])
+
+    def sharpe(self, fund, start=None, end=None):
+        """Annualized Sharpe ratio of one fund over ``[start, end]``."""
+        return float(self.query(start, end, [fund])["sharpe"].iloc[0])
+
+    # ---
+    # Persistence
+    # ---
+
+    def save(self, path):
+        """Write the prefix sums and labels to an ``.npz`` file."""
+        np.savez(
+            path,
+            columns=np.array(self.columns, dtype=str),
+            market=self.market,
+            num_trading_days=self.num_trading_days,
+            dates=self.dates.to_numpy(dtype="datetime64[ns]").view(np.int64),
+            center=self.center,
+            sum_x=self.sum_x,
+            sum_xx=self.sum_xx,
+            sum_xm=self.sum_xm,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by ``save`` without recomputing anything."""
+        index = cls.__new__(cls)
+        with np.load(path, allow_pickle=False) as data:
+            index.columns = [str(name) for name in data["columns"]]
+            index.market = str(data["market"])
+            # .item() keeps the stored type: 252 stays an int, 365.25 a float
+            index.num_trading_days = np.asarray(data["num_trading_days"]).item()
+            index.dates = pd.DatetimeIndex(data["dates"].view("datetime64[ns]"), name="date")
+            index.center = data["center"]
+            index.sum_x = data["sum_x"]
+            index.sum_xx = data["sum_xx"]
+            index.sum_xm = data["sum_xm"]
+        index._positions = {name: pos for pos, name in enumerate(index.columns)}
+        return index
+
+
+# ---
+# Local HTTP endpoint
+# ---
+
+def _json_value(value):
+    # NaN / inf are not valid JSON; send them as null
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    # GET /funds                  -> list of columns and the date range
+    #                                (null range without dates)
+    # GET /query?start=&end=&fund= (fund may repeat) -> metrics per fund
+
+    index = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        try:
+            if url.path == "/funds":
+                dates = self.index.dates
+                # An index without dates still lists its columns; only the range is null
+                body = {"funds": self.index.columns,
+                        "market": self.index.market,
+                        "start": dates[0].isoformat() if len(dates) else None,
+                        "end": dates[-1].isoformat() if len(dates) else None}
+            elif url.path == "/query":
+                frame = self.index.query(params.get("start", [None])[0],
+                                         params.get("end", [None])[0],
+                                         params.get("fund"))
+                body = {name: {metric: _json_value(value) for metric, value in row.items()}
+                        for name, row in frame.iterrows()}
+            else:
+                self._send(404, {"error": f"unknown path {url.path}"})
+                return
+        except (KeyError, ValueError) as exc:
+            self._send(400, {"error": str(exc).strip("'\"")})
+            return
+        self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(index, host="127.0.0.1", port=8765):
+    """HTTP server answering ``/funds`` and ``/query`` from ``index``.
+
+    Call ``serve_forever()`` on the result (or run it in a thread) and
+    ``shutdown()`` to stop it.
+    """
+    handler = type("QueryHandler", (_QueryHandler,), {"index": index})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve date-range risk queries over HTTP.")
+    parser.add_argument("nav_path", nargs="?", default=rra.DEFAULT_NAV_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--market", default=MARKET)
+    args = parser.parse_args(argv)
+
+    index = RangeQueryIndex.from_prices(rra.load_navs(args.nav_path), market=args.market)
+    server = serve(index, args.host, args.port)
+    print(f"serving {len(index.columns)} columns, {len(index.dates)} dates "
+          f"on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
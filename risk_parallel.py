@@ -0,0 +1,168 @@
+"""Parallel execution of the per-fund risk metrics across a process pool.
+
+Once the market returns are known, the rolling beta, rolling std and Sharpe
+ratio of each fund are independent of every other fund.  ``run_universe``
+splits the fund columns into contiguous slices and hands them to a
+``ProcessPoolExecutor``.  The fund returns, the market window statistics and
+the output matrices all live in ``multiprocessing.shared_memory`` blocks:
+workers attach to them by name and write their slice of the results in
+place, so neither the inputs nor the (dates x funds) outputs are pickled.
+Only the per-fund summary values travel back through the pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import (
+    MARKET,
+    NUM_TRADING_DAYS,
+    _market_window_stats,
+    _returns_block,
+    _rolling_beta_block,
+    _rolling_std_block,
+)
+
+
+@dataclass
+class UniverseResult:
+    """Per-fund results of ``run_universe``.
+
+    ``beta`` and ``std_rolling`` are (dates x funds) DataFrames; ``summary``
+    has one row per fund with ann_mean, ann_std, sharpe and beta_mean.
+    """
+
+    beta: pd.DataFrame
+    std_rolling: pd.DataFrame
+    summary: pd.DataFrame
+
+
+# ---
+# Shared memory helpers
+# ---
+
+def _create_shared(shape, dtype=np.float64):
+    # Allocate a shared memory block and return it with its ndarray view and
+    # the (name, shape, dtype) spec workers use to attach to it
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return shm, array, (shm.name, tuple(shape), dtype.str)
+
+
+def _attach_shared(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+# ---
+# Worker
+# ---
+
+def _universe_worker(specs, lo, hi, std_window, beta_window, num_trading_days):
+    # Compute the metrics of fund columns [lo, hi) from the shared inputs and
+    # write the rolling results straight into the shared outputs
+    handles = []
+    try:
+        arrays = {}
+        for key, spec in specs.items():
+            shm, array = _attach_shared(spec)
+            handles.append(shm)
+            arrays[key] = array
+
+        values = arrays["returns"][:, lo:hi]
+        market_stats = (arrays["market"], arrays["sum_m"], arrays["var_m"])
+        arrays["beta"][:, lo:hi] = _rolling_beta_block(values, market_stats, beta_window)
+        arrays["std_rolling"][:, lo:hi] = _rolling_std_block(values, std_window)
+
+        std = values.std(axis=0, ddof=1)
+        ann_std = std * np.sqrt(num_trading_days)
+        ann_mean = values.mean(axis=0) * num_trading_days
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = ann_mean / ann_std
+        beta_mean = np.nanmean(arrays["beta"][:, lo:hi], axis=0) if len(values) >= beta_window \
+            else np.full(hi - lo, np.nan)
+        return lo, hi, ann_mean, ann_std, sharpe, beta_mean
+    finally:
+        # Drop every ndarray view before closing the blocks they point into
+        arrays = values = market_stats = None
+        for shm in handles:
+            shm.close()
+
+
+def _slices(count, workers, chunk_size=None):
+    # Contiguous [lo, hi) column ranges, a few per worker for load balancing
+    if chunk_size is None:
+        chunk_size = max(1, -(-count // (workers * 4)))
+    return [(lo, min(lo + chunk_size, count)) for lo in range(0, count, chunk_size)]
+
+
+# ---
+# Entry point
+# ---
+
+def run_universe(prices, market=MARKET, workers=None, std_window=21, beta_window=60,
+                 num_trading_days=NUM_TRADING_DAYS, chunk_size=None):
+    """Compute rolling beta, rolling std and Sharpe for every fund in parallel.
+
+    ``prices`` is a NAV price DataFrame containing the ``market`` column.
+    ``workers`` defaults to ``os.cpu_count()``; with ``workers=1`` the slices
+    run in this process without a pool.  ``chunk_size`` is the number of fund
+    columns per task.
+    """
+    workers = workers or os.cpu_count() or 1
+    returns, index = _returns_block(prices)
+    columns = list(prices.columns)
+    market_pos = columns.index(market)
+    funds = columns[:market_pos] + columns[market_pos + 1:]
+    dates, count = len(index), len(funds)
+
+    blocks = []
+    try:
+        def shared(key, shape):
+            shm, array, spec = _create_shared(shape)
+            blocks.append(shm)
+            specs[key] = spec
+            return array
+
+        # Shared read-only inputs: fund returns and the market window stats
+        specs = {}
+        shared("returns", (dates, count))[:] = np.delete(returns, market_pos, axis=1)
+        market_stats = _market_window_stats(returns[:, market_pos], beta_window)
+        for key, array in zip(("market", "sum_m", "var_m"), market_stats):
+            shared(key, (dates,))[:] = array
+
+        # Shared outputs written in place by the workers
+        beta = shared("beta", (dates, count))
+        std_rolling = shared("std_rolling", (dates, count))
+
+        summary = np.empty((count, 4))
+        tasks = _slices(count, workers, chunk_size)
+        args = (std_window, beta_window, num_trading_days)
+        if workers == 1:
+            results = [_universe_worker(specs, lo, hi, *args) for lo, hi in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_universe_worker, specs, lo, hi, *args) for lo, hi in tasks]
+                results = [future.result() for future in futures]
+        for lo, hi, *values in results:
+            summary[lo:hi] = np.column_stack(values)
+
+        result = UniverseResult(
+            beta=pd.DataFrame(beta.copy(), index=index, columns=funds),
+            std_rolling=pd.DataFrame(std_rolling.copy(), index=index, columns=funds),
+            summary=pd.DataFrame(summary, index=funds,
+                                 columns=["ann_mean", "ann_std", "sharpe", "beta_mean"]),
+        )
+    finally:
+        beta = std_rolling = None
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return result
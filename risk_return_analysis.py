@@ -1,596 +1,644 @@
 #!/usr/bin/env python
 # coding: utf-8
+"""Analyzing Portfolio Risk and Return.
 
-# # Analyzing Portfolio Risk and Return
-# 
-# In this Challenge, you'll assume the role of a quantitative analyst for a FinTech investing platform. This platform aims to offer clients a one-stop online investment solution for their retirement portfolios that’s both inexpensive and high quality. (Think about [Wealthfront](https://www.wealthfront.com/) or [Betterment](https://www.betterment.com/)). To keep the costs low, the firm uses algorithms to build each client's portfolio. The algorithms choose from various investment styles and options.
-# 
-# You've been tasked with evaluating four new investment options for inclusion in the client portfolios. Legendary fund and hedge-fund managers run all four selections. (People sometimes refer to these managers as **whales**, because of the large amount of money that they manage). You’ll need to determine the fund with the most investment potential based on key risk-management metrics: the daily returns, standard deviations, Sharpe ratios, and betas.
-# 
-# ## Instructions
-# 
-# ### Import the Data
-# 
-# Use the ``risk_return_analysis.ipynb`` file to complete the following steps:
-# 
-# 1. Import the required libraries and dependencies.
-# 
-# 2. Use the `read_csv` function and the `Path` module to read the `whale_navs.csv` file into a Pandas DataFrame. Be sure to create a `DateTimeIndex`. Review the first five rows of the DataFrame by using the `head` function.
-# 
-# 3. Use the Pandas `pct_change` function together with `dropna` to create the daily returns DataFrame. Base this DataFrame on the NAV prices of the four portfolios and on the closing price of the S&P 500 Index. Review the first five rows of the daily returns DataFrame.
-# 
-# ### Analyze the Performance
-# 
-# Analyze the data to determine if any of the portfolios outperform the broader stock market, which the S&P 500 represents. To do so, complete the following steps:
-# 
-# 1. Use the default Pandas `plot` function to visualize the daily return data of the four fund portfolios and the S&P 500. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-# 2. Use the Pandas `cumprod` function to calculate the cumulative returns for the four fund portfolios and the S&P 500. Review the last five rows of the cumulative returns DataFrame by using the Pandas `tail` function.
-# 
-# 3. Use the default Pandas `plot` to visualize the cumulative return values for the four funds and the S&P 500 over time. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-# 4. Answer the following question: Based on the cumulative return data and the visualization, do any of the four fund portfolios outperform the S&P 500 Index?
-# 
-# ### Analyze the Volatility
-# 
-# Analyze the volatility of each of the four fund portfolios and of the S&P 500 Index by using box plots. To do so, complete the following steps:
-# 
-# 1. Use the Pandas `plot` function and the `kind="box"` parameter to visualize the daily return data for each of the four portfolios and for the S&P 500 in a box plot. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-# 2. Use the Pandas `drop` function to create a new DataFrame that contains the data for just the four fund portfolios by dropping the S&P 500 column. Visualize the daily return data for just the four fund portfolios by using another box plot. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-#     > **Hint** Save this new DataFrame&mdash;the one that contains the data for just the four fund portfolios. You’ll use it throughout the analysis.
-# 
-# 3. Answer the following question: Based on the box plot visualization of just the four fund portfolios, which fund was the most volatile (with the greatest spread) and which was the least volatile (with the smallest spread)?
-# 
-# ### Analyze the Risk
-# 
-# Evaluate the risk profile of each portfolio by using the standard deviation and the beta. To do so, complete the following steps:
-# 
-# 1. Use the Pandas `std` function to calculate the standard deviation for each of the four portfolios and for the S&P 500. Review the standard deviation calculations, sorted from smallest to largest.
-# 
-# 2. Calculate the annualized standard deviation for each of the four portfolios and for the S&P 500. To do that, multiply the standard deviation by the square root of the number of trading days. Use 252 for that number.
-# 
-# 3. Use the daily returns DataFrame and a 21-day rolling window to plot the rolling standard deviations of the four fund portfolios and of the S&P 500 index. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-# 4. Use the daily returns DataFrame and a 21-day rolling window to plot the rolling standard deviations of only the four fund portfolios. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-# 5. Answer the following three questions:
-# 
-# * Based on the annualized standard deviation, which portfolios pose more risk than the S&P 500?
-# 
-# * Based on the rolling metrics, does the risk of each portfolio increase at the same time that the risk of the S&P 500 increases?
-# 
-# * Based on the rolling standard deviations of only the four fund portfolios, which portfolio poses the most risk? Does this change over time?
-# 
-# ### Analyze the Risk-Return Profile
-# 
-# To determine the overall risk of an asset or portfolio, quantitative analysts and investment managers consider not only its risk metrics but also its risk-return profile. After all, if you have two portfolios that each offer a 10% return but one has less risk, you’d probably invest in the smaller-risk portfolio. For this reason, you need to consider the Sharpe ratios for each portfolio. To do so, complete the following steps:
-# 
-# 1. Use the daily return DataFrame to calculate the annualized average return data for the four fund portfolios and for the S&P 500. Use 252 for the number of trading days. Review the annualized average returns, sorted from lowest to highest.
-# 
-# 2. Calculate the Sharpe ratios for the four fund portfolios and for the S&P 500. To do that, divide the annualized average return by the annualized standard deviation for each. Review the resulting Sharpe ratios, sorted from lowest to highest.
-# 
-# 3. Visualize the Sharpe ratios for the four funds and for the S&P 500 in a bar chart. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-# 4. Answer the following question: Which of the four portfolios offers the best risk-return profile? Which offers the worst?
-# 
-# #### Diversify the Portfolio
-# 
-# Your analysis is nearing completion. Now, you need to evaluate how the portfolios react relative to the broader market. Based on your analysis so far, choose two portfolios that you’re most likely to recommend as investment options. To start your analysis, complete the following step:
-# 
-# * Use the Pandas `var` function to calculate the variance of the S&P 500 by using a 60-day rolling window. Visualize the last five rows of the variance of the S&P 500.
-# 
-# Next, for each of the two portfolios that you chose, complete the following steps:
-# 
-# 1. Using the 60-day rolling window, the daily return data, and the S&P 500 returns, calculate the covariance. Review the last five rows of the covariance of the portfolio.
-# 
-# 2. Calculate the beta of the portfolio. To do that, divide the covariance of the portfolio by the variance of the S&P 500.
-# 
-# 3. Use the Pandas `mean` function to calculate the average value of the 60-day rolling beta of the portfolio.
-# 
-# 4. Plot the 60-day rolling beta. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-# 
-# Finally, answer the following two questions:
-# 
-# * Which of the two portfolios seem more sensitive to movements in the S&P 500?
-# 
-# * Which of the two portfolios do you recommend for inclusion in your firm’s suite of fund offerings?
-# 
-
-# ### Import the Data
-
-# #### Step 1: Import the required libraries and dependencies.
-
-# In[ ]:
-
-
-# Import the required libraries and dependencies
+Library form of ``risk_return_analysis.ipynb``.  The notebook evaluates four
+"whale" fund portfolios against the S&P 500 in six phases (Import the Data,
+Analyze the Performance, Analyze the Volatility, Analyze the Risk, Analyze the
+Risk-Return Profile, Diversify the Portfolio).  This module exposes the same
+calculations as functions so they can be imported by batch jobs without
+running the analysis, displaying tables or building plots at import time.
 
-import pandas as pd
-import numpy as np
-from pathlib import Path
-
-
-# #### Step 2: Use the `read_csv` function and the `Path` module to read the `whale_navs.csv` file into a Pandas DataFrame. Be sure to create a `DateTimeIndex`. Review the first five rows of the DataFrame by using the `head` function.
-
-# In[ ]:
+Plotting helpers only touch matplotlib (through the pandas plotting backend)
+when they are called.  Running the module as a script reproduces the notebook
+walkthrough::
 
+    python risk_return_analysis.py
+"""
 
-# Import the data by reading in the CSV file and setting the DatetimeIndex 
-# Review the first 5 rows of the DataFrame
+from dataclasses import dataclass
+from pathlib import Path
 
-whale_navs_prices = pd.read_csv(
-    Path("./Resources/whale_navs.csv"), 
-    index_col="date", 
-    parse_dates=True, 
-    infer_datetime_format=True)
+import numpy as np
+import pandas as pd
 
-display(whale_navs_prices.head())
 
+# Default location of the whale NAV prices, the market column they are
+# compared against and the number of trading days used for annualization
 
-# #### Step 3: Use the Pandas `pct_change` function together with `dropna` to create the daily returns DataFrame. Base this DataFrame on the NAV prices of the four portfolios and on the closing price of the S&P 500 Index. Review the first five rows of the daily returns DataFrame.
+DEFAULT_NAV_PATH = Path("./Resources/whale_navs.csv")
+MARKET = "S&P 500"
+NUM_TRADING_DAYS = 252
 
-# In[ ]:
 
+@dataclass
+class RiskMetrics:
+    """Risk and return metrics derived from one NAV price table.
 
-# Prepare for the analysis by converting the dataframe of NAVs and prices to daily returns
-# Drop any rows with all missing values
-# Review the first five rows of the daily returns DataFrame.
+    ``daily_returns`` and ``cum_returns`` are DataFrames indexed by date;
+    the remaining fields are Series indexed by fund (and market) name.
+    ``observations`` counts each column's valid returns and
+    ``periods_per_year`` is the annualization factor that was applied.
+    """
 
-whale_navs_daily_returns = whale_navs_prices.pct_change().dropna()
+    daily_returns: pd.DataFrame
+    cum_returns: pd.DataFrame
+    std: pd.Series
+    ann_std: pd.Series
+    ann_mean: pd.Series
+    sharpe: pd.Series
+    observations: pd.Series = None
+    periods_per_year: pd.Series = None
 
-display(whale_navs_daily_returns.head())
+    @property
+    def funds(self):
+        """Names of the fund columns, i.e. every column except the market."""
+        return [name for name in self.daily_returns.columns if name != MARKET]
 
 
 # ---
-
-# ## Quantitative Analysis
-# 
-# The analysis has several components: performance, volatility, risk, risk-return profile, and portfolio diversification. You’ll analyze each component one at a time.
-
-# ###  Analyze the Performance
-# 
-# Analyze the data to determine if any of the portfolios outperform the broader stock market, which the S&P 500 represents.
-
-# #### Step 1:  Use the default Pandas `plot` function to visualize the daily return data of the four fund portfolios and the S&P 500. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Plot the daily return data of the 4 funds and the S&P 500 
-# Inclue a title parameter and adjust the figure size
-
-whale_navs_daily_returns.plot(
-    figsize = (10,7),
-    title = "Whale NAVS Fund Portfolio & Market: Daily Returns")
-
-
-# #### Step 2: Use the Pandas `cumprod` function to calculate the cumulative returns for the four fund portfolios and the S&P 500. Review the last five rows of the cumulative returns DataFrame by using the Pandas `tail` function.
-
-# In[ ]:
-
-
-# Calculate and plot the cumulative returns of the 4 fund portfolios and the S&P 500
-# Review the last 5 rows of the cumulative returns DataFrame
-
-whale_navs_cum_daily_returns = (1 + whale_navs_daily_returns).cumprod() - 1
-
-display(whale_navs_cum_daily_returns.tail())
-
-
-# #### Step 3: Use the default Pandas `plot` to visualize the cumulative return values for the four funds and the S&P 500 over time. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Visualize the cumulative returns using the Pandas plot function
-# Include a title parameter and adjust the figure size
-
-whale_navs_cum_daily_returns.plot(
-    figsize = (10,7),
-    title = "Whale NAVS Fund Portfolio & Market: Cumulative Daily Returns")
-
-
-# #### Step 4: Answer the following question: Based on the cumulative return data and the visualization, do any of the four fund portfolios outperform the S&P 500 Index?
-
-# **Question** Based on the cumulative return data and the visualization, do any of the four fund portfolios outperform the S&P 500 Index?
-# 
-# **Answer** Up until early 2016, there were short periods of time where some of the funds outperformed the S&P 500.  But from that point forward, the S&P 500 outperformed all (four) funds.
-
+# Import the Data
 # ---
 
-# ### Analyze the Volatility
-# 
-# Analyze the volatility of each of the four fund portfolios and of the S&P 500 Index by using box plots.
-
-# #### Step 1: Use the Pandas `plot` function and the `kind="box"` parameter to visualize the daily return data for each of the four portfolios and for the S&P 500 in a box plot. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Use the daily return data to create box plots to visualize the volatility of the 4 funds and the S&P 500 
-# Include a title parameter and adjust the figure size
-
-whale_navs_daily_returns.plot(
-    kind = "box",
-    figsize = (15,20),
-    title = "Whale NAVS Fund Portfolio & Market: Daily Returns Box Plot")
-
-
-# #### Step 2: Use the Pandas `drop` function to create a new DataFrame that contains the data for just the four fund portfolios by dropping the S&P 500 column. Visualize the daily return data for just the four fund portfolios by using another box plot. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Create a new DataFrame containing only the 4 fund portfolios by dropping the S&P 500 column from the DataFrame
-# Create box plots to reflect the return data for only the 4 fund portfolios
-# Include a title parameter and adjust the figure size
-
-whale_navs_daily_returns_funds = whale_navs_daily_returns.drop(columns = "S&P 500")
-
-whale_navs_daily_returns_funds.plot(
-    kind = "box",
-    figsize = (15,10),
-    title = "Whale NAVS Fund Portfolio: Daily Returns Box Plot")
-
+def load_navs(path=DEFAULT_NAV_PATH, cache=False):
+    """Read the NAV prices CSV into a DataFrame with a DatetimeIndex.
+
+    With ``cache=True`` the prices come from the memory-mapped binary cache
+    of ``nav_cache`` (built on first use and rebuilt when the CSV changes).
+    """
+    if cache:
+        from nav_cache import load_navs_cached
+        return load_navs_cached(path)
+    return pd.read_csv(Path(path), index_col="date", parse_dates=True)
+
+
+def daily_returns(prices):
+    """Daily returns of ``prices``, dropping rows with any missing value.
+
+    Equivalent to ``prices.pct_change().dropna()`` but computed directly on
+    the float64 block.
+    """
+    returns, index = _returns_block(prices)
+    return pd.DataFrame(returns, index=index, columns=prices.columns)
+
+
+def _returns_block(prices):
+    # Convert the NAVs to one float64 block and derive the daily returns,
+    # keeping only the rows where every column has a valid return
+    values = prices.to_numpy(dtype=np.float64)
+    returns = values[1:] / values[:-1]
+    returns -= 1.0
+    valid = np.isfinite(returns).all(axis=1)
+    index = prices.index[1:]
+    if not valid.all():
+        returns = returns[valid]
+        index = index[valid]
+    return returns, index
+
+
+def masked_returns(prices):
+    """Daily returns that keep per-column gaps instead of dropping dates.
+
+    Each column's return is taken from its previous *valid* price, so a fund
+    missing a date (a NaN, or a holiday in its own calendar while the market
+    trades) gets one return spanning the gap and NaN on the missing date,
+    while every other column keeps that date.  Only dates where no column
+    has a return are dropped.
+    """
+    returns, _, index, _ = _masked_returns_block(prices)
+    return pd.DataFrame(returns, index=index, columns=prices.columns)
+
+
+def _masked_returns_block(prices):
+    # One pass over the float64 block: the row of the last valid price at or
+    # before each date (int32, running maximum), one gather of those prices
+    # and an in-place masked division.  Returns (returns with NaN gaps,
+    # valid mask, index, days between each column's first and last price)
+    values = prices.to_numpy(dtype=np.float64)
+    has_price = np.isfinite(values)
+    last = np.where(has_price, np.arange(len(values), dtype=np.int32)[:, None], np.int32(-1))
+    np.maximum.accumulate(last, axis=0, out=last)
+
+    previous = last[:-1]
+    valid = has_price[1:] & (previous >= 0)
+    returns = np.take_along_axis(values, np.maximum(previous, 0), axis=0)
+    np.divide(values[1:], returns, out=returns, where=valid)
+    returns[~valid] = np.nan
+    returns -= 1.0
+
+    dates = prices.index.to_numpy(dtype="datetime64[ns]")
+    first_row = np.argmax(has_price, axis=0)
+    span_days = np.full(values.shape[1], np.nan)
+    if len(dates):
+        priced = last[-1] >= 0
+        span_days[priced] = (dates[last[-1][priced]] - dates[first_row[priced]]) / np.timedelta64(1, "D")
+
+    index = prices.index[1:]
+    keep = valid.any(axis=1)
+    if not keep.all():
+        returns = returns[keep]
+        valid = valid[keep]
+        index = index[keep]
+    return returns, valid, index, span_days
+
+
+def _masked_moments(returns, valid, block_rows=4096):
+    # Count, mean and sample std of every column over its valid entries; the
+    # squared deviations are summed over row blocks to bound the temporaries
+    counts = valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.add.reduce(returns, axis=0, where=valid) / counts
+        m2 = np.zeros(returns.shape[1])
+        for start in range(0, len(returns), block_rows):
+            dev = returns[start:start + block_rows] - mean
+            dev *= dev
+            m2 += np.add.reduce(dev, axis=0, where=valid[start:start + block_rows])
+        std = np.sqrt(m2 / (counts - 1))
+    return counts, mean, std
 
-# #### Step 3: Answer the following question: Based on the box plot visualization of just the four fund portfolios, which fund was the most volatile (with the greatest spread) and which was the least volatile (with the smallest spread)?
-
-# **Question** Based on the box plot visualization of just the four fund portfolios, which fund was the most volatile (with the greatest spread) and which was the least volatile (with the smallest spread)?
-# 
-# **Answer** Most volatile ==> BERKSHIRE HATHAWAY INC; 
-#            Least volatile ==> TIGER GLOBAL MANAGEMENT LLC
 
 # ---
-
-# ### Analyze the Risk
-# 
-# Evaluate the risk profile of each portfolio by using the standard deviation and the beta.
-
-# #### Step 1: Use the Pandas `std` function to calculate the standard deviation for each of the four portfolios and for the S&P 500. Review the standard deviation calculations, sorted from smallest to largest.
-
-# In[ ]:
-
-
-# Calculate and sort the standard deviation for all 4 portfolios and the S&P 500
-# Review the standard deviations sorted smallest to largest
-
-whale_navs_std = whale_navs_daily_returns.std()
-whale_navs_std_sorted = whale_navs_std.sort_values()
-
-display(whale_navs_std_sorted)
-
-
-# #### Step 2: Calculate the annualized standard deviation for each of the four portfolios and for the S&P 500. To do that, multiply the standard deviation by the square root of the number of trading days. Use 252 for that number.
-
-# In[ ]:
-
-
-# Calculate and sort the annualized standard deviation (252 trading days) of the 4 portfolios and the S&P 500
-# Review the annual standard deviations smallest to largest
-
-num_trading_days = 252;
-whale_navs_ann_std = whale_navs_std * np.sqrt(num_trading_days)
-whale_navs_ann_std_sorted = whale_navs_ann_std.sort_values()
-
-display(whale_navs_ann_std_sorted)
-
-
-# #### Step 3: Use the daily returns DataFrame and a 21-day rolling window to plot the rolling standard deviations of the four fund portfolios and of the S&P 500 index. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Using the daily returns DataFrame and a 21-day rolling window, 
-# plot the rolling standard deviation of the 4 portfolios and the S&P 500
-# Include a title parameter and adjust the figure size
-
-whale_navs_std_rolling21 = whale_navs_daily_returns.rolling(window = 21).std()
-
-whale_navs_std_rolling21.plot(
-    figsize = (15,10),
-    title = "Whale NAVS Fund Portfolio & Market: Daily Return Standard Deviation w/ Rolling Window = 21")
-
-
-# #### Step 4: Use the daily returns DataFrame and a 21-day rolling window to plot the rolling standard deviations of only the four fund portfolios. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Using the daily return data and a 21-day rolling window, plot the rolling standard deviation of just the 4 portfolios. 
-# Include a title parameter and adjust the figure size
-
-whale_navs_std_funds_rolling21 = whale_navs_daily_returns_funds.rolling(window = 21).std()
-
-whale_navs_std_funds_rolling21.plot(
-    figsize = (15,10),
-    title = "Whale NAVS Fund Portfolio: Daily Return Standard Deviation w/ Rolling Window = 21")
-
-
-# #### Step 5: Answer the following three questions:
-# 
-# 1. Based on the annualized standard deviation, which portfolios pose more risk than the S&P 500?
-# 
-# 2. Based on the rolling metrics, does the risk of each portfolio increase at the same time that the risk of the S&P 500 increases?
-# 
-# 3. Based on the rolling standard deviations of only the four fund portfolios, which portfolio poses the most risk? Does this change over time?
-
-# **Question 1**  Based on the annualized standard deviation, which portfolios pose more risk than the S&P 500?
-# 
-# **Answer 1** None
-
-# **Question 2** Based on the rolling metrics, does the risk of each portfolio increase at the same time that the risk of the S&P 500 increases?
-# 
-# **Answer 2** There seems to be some correlation in the direction of the std deviation (i.e. risk) between the funds and the market (s&p500) - although the absolute value of the std deviation (risk) is higher in the market.  The correlation is more prevalent in certain time frames (e.g. beginning of 2020).  It would also be more prevalent if we further smooth out the rolling std window (i.e. increase the # of days in rolling window)
-# 
-
-# **Question 3** Based on the rolling standard deviations of only the four fund portfolios, which portfolio poses the most risk? Does this change over time? 
-# 
-# **Answer 3** Overall, Berkshire Hathaway fund is the most riskiest fund based on rolling std deviation plots. Yes this does change over time.  In early 2015, Berkshire Hathaway and the Soros fund had similar std deviations.  However, in late 2015, Birskhire fund decreased in std deviation whereas the Tiger Global fund spiked in std deviation.  For most of late 2016 to late 2018, the Birkshire fund was clearly the most riskiest fund.  In 2019, the Paulson fund started to spike on par with the Birkshire fund std deviation. And finally in early 2020, all the funds std deviations spike together.
-
+# Analyze the Performance / Volatility / Risk / Risk-Return Profile
 # ---
 
-# ### Analyze the Risk-Return Profile
-# 
-# To determine the overall risk of an asset or portfolio, quantitative analysts and investment managers consider not only its risk metrics but also its risk-return profile. After all, if you have two portfolios that each offer a 10% return but one has less risk, you’d probably invest in the smaller-risk portfolio. For this reason, you need to consider the Sharpe ratios for each portfolio.
-
-# #### Step 1: Use the daily return DataFrame to calculate the annualized average return data for the four fund portfolios and for the S&P 500. Use 252 for the number of trading days. Review the annualized average returns, sorted from lowest to highest.
-
-# In[ ]:
-
-
-# Calculate the annual average return data for the for fund portfolios and the S&P 500
-# Use 252 as the number of trading days in the year
-# Review the annual average returns sorted from lowest to highest
-
-whale_navs_ann_avg_daily_returns = whale_navs_daily_returns.mean() * num_trading_days
-
-display(whale_navs_ann_avg_daily_returns.sort_values())
-
-
-# #### Step 2: Calculate the Sharpe ratios for the four fund portfolios and for the S&P 500. To do that, divide the annualized average return by the annualized standard deviation for each. Review the resulting Sharpe ratios, sorted from lowest to highest.
-
-# In[ ]:
-
+def compute_risk_metrics(prices, num_trading_days=NUM_TRADING_DAYS, gaps="drop"):
+    """Compute returns, volatility and Sharpe ratios for every column.
+
+    The daily returns are derived once into a single float64 block and all
+    other metrics are reductions over that block, instead of separate pandas
+    passes for ``pct_change``, ``cumprod``, ``std`` and ``mean``.
+
+    ``gaps="drop"`` reproduces ``pct_change().dropna()``: a date missing in
+    any column is dropped for all.  ``gaps="mask"`` uses ``masked_returns``
+    so each column keeps all its own observations.  ``num_trading_days=None``
+    annualizes each column by its observed returns per year (valid returns
+    over the years between its first and last price) instead of a fixed 252.
+    """
+    if gaps == "mask":
+        return _masked_risk_metrics(prices, num_trading_days)
+    if gaps != "drop":
+        raise ValueError(f"unknown gaps mode {gaps!r}, expected 'drop' or 'mask'")
+    returns, index = _returns_block(prices)
+    columns = prices.columns
+    observations = np.full(len(columns), len(returns))
+    if num_trading_days is None:
+        span_days = (index[-1] - prices.index[0]).days if len(index) else 0
+        num_trading_days = _periods_per_year(observations, np.full(len(columns), span_days))
+
+    # Cumulative returns: (1 + r).cumprod() - 1
+    cum_returns = np.cumprod(returns + 1.0, axis=0)
+    cum_returns -= 1.0
+
+    # Daily and annualized standard deviation, annualized mean and Sharpe
+    std = returns.std(axis=0, ddof=1)
+    ann_std = std * np.sqrt(num_trading_days)
+    ann_mean = returns.mean(axis=0) * num_trading_days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = ann_mean / ann_std
+
+    return RiskMetrics(
+        daily_returns=pd.DataFrame(returns, index=index, columns=columns),
+        cum_returns=pd.DataFrame(cum_returns, index=index, columns=columns),
+        std=pd.Series(std, index=columns),
+        ann_std=pd.Series(ann_std, index=columns),
+        ann_mean=pd.Series(ann_mean, index=columns),
+        sharpe=pd.Series(sharpe, index=columns),
+        observations=pd.Series(observations, index=columns),
+        periods_per_year=pd.Series(np.broadcast_to(num_trading_days, len(columns)), index=columns,
+                                   dtype=np.float64),
+    )
+
+
+def _periods_per_year(observations, span_days):
+    # Observed returns per (365.25-day) year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return observations / (np.asarray(span_days, dtype=np.float64) / 365.25)
+
+
+def _masked_risk_metrics(prices, num_trading_days):
+    # compute_risk_metrics(gaps="mask"): moments over each column's valid
+    # returns; cumulative returns carry forward over a column's gaps
+    returns, valid, index, span_days = _masked_returns_block(prices)
+    columns = prices.columns
+    observations, mean, std = _masked_moments(returns, valid)
+    periods = (_periods_per_year(observations, span_days) if num_trading_days is None
+               else np.full(len(columns), float(num_trading_days)))
+
+    cum_returns = np.where(valid, returns, 0.0)
+    cum_returns += 1.0
+    np.cumprod(cum_returns, axis=0, out=cum_returns)
+    cum_returns -= 1.0
+    cum_returns[~np.logical_or.accumulate(valid, axis=0)] = np.nan
+
+    ann_std = std * np.sqrt(periods)
+    ann_mean = mean * periods
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = ann_mean / ann_std
+
+    return RiskMetrics(
+        daily_returns=pd.DataFrame(returns, index=index, columns=columns),
+        cum_returns=pd.DataFrame(cum_returns, index=index, columns=columns),
+        std=pd.Series(std, index=columns),
+        ann_std=pd.Series(ann_std, index=columns),
+        ann_mean=pd.Series(ann_mean, index=columns),
+        sharpe=pd.Series(sharpe, index=columns),
+        observations=pd.Series(observations, index=columns),
+        periods_per_year=pd.Series(periods, index=columns),
+    )
+
+
+def _window_sums(block, window):
+    # Trailing window sums of each column via one cumulative sum, written
+    # into a preallocated output (the first window - 1 rows are NaN).  A NaN
+    # would poison every later cumulative sum, so gaps are summed as zero
+    # and windows containing one are set to NaN (pandas' min_periods=window)
+    out = np.full(block.shape, np.nan)
+    if block.shape[0] < window:
+        return out
+    missing = np.isnan(block)
+    has_gaps = missing.any()
+    if has_gaps:
+        block = np.where(missing, 0.0, block)
+    csum = np.cumsum(block, axis=0)
+    out[window - 1] = csum[window - 1]
+    np.subtract(csum[window:], csum[:-window], out=out[window:])
+    if has_gaps:
+        gaps = np.cumsum(missing, axis=0, dtype=np.int32)
+        gaps[window:] -= gaps[:-window].copy()
+        out[window - 1:][gaps[window - 1:] > 0] = np.nan
+    return out
+
+
+def _column_center(values):
+    # Full-sample column means used to center the rolling sums, ignoring
+    # gaps (0 for a column without any value)
+    if not np.isnan(values).any():
+        return values.mean(axis=0)
+    valid = ~np.isnan(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        center = np.add.reduce(values, axis=0, where=valid) / valid.sum(axis=0)
+    return np.nan_to_num(center)
+
+
+def rolling_std(returns, window=21):
+    """Rolling standard deviation of every column over ``window`` rows.
+
+    Matches ``returns.rolling(window).std()``.  Columns are centered on their
+    full-sample mean before the running sums are taken, which keeps the sums
+    small and the variance free of cancellation error.
+    """
+    std = _rolling_std_block(returns.to_numpy(dtype=np.float64), window)
+    return pd.DataFrame(std, index=returns.index, columns=returns.columns)
+
+
+def _rolling_std_block(values, window):
+    # Rolling std of a (dates x columns) float64 block
+    centered = values - _column_center(values)
+    sum_x = _window_sums(centered, window)
+    centered *= centered
+    var = _window_sums(centered, window)
+    var -= sum_x * sum_x / window
+    var /= window - 1
+    np.maximum(var, 0.0, out=var)
+    return np.sqrt(var, out=var)
 
-# Calculate the annualized Sharpe Ratios for each of the 4 portfolios and the S&P 500.
-# Review the Sharpe ratios sorted lowest to highest
-
-whale_navs_ann_sharpe_ratio = whale_navs_ann_avg_daily_returns / whale_navs_ann_std
-
-display(whale_navs_ann_sharpe_ratio.sort_values())
-
-
-# #### Step 3: Visualize the Sharpe ratios for the four funds and for the S&P 500 in a bar chart. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Visualize the Sharpe ratios as a bar chart
-# Include a title parameter and adjust the figure size
-
-whale_navs_ann_sharpe_ratio.plot(
-    kind = 'bar',
-    figsize = (10,7),
-    title = "Whale NAVS Fund Portfolio & Market: Annual Sharpe Ratio")
-
-
-# #### Step 4: Answer the following question: Which of the four portfolios offers the best risk-return profile? Which offers the worst?
-
-# **Question** Which of the four portfolios offers the best risk-return profile? Which offers the worst?
-#     
-# **Answer** Best ==> Birkshire Hathaway Fund;
-#            Worst ==> Paulson & Co Fund
 
+# ---
+# Diversify the Portfolio
 # ---
 
-# ### Diversify the Portfolio
-# 
-# Your analysis is nearing completion. Now, you need to evaluate how the portfolios react relative to the broader market. Based on your analysis so far, choose two portfolios that you’re most likely to recommend as investment options.
-
-# #### Use the Pandas `var` function to calculate the variance of the S&P 500 by using a 60-day rolling window. Visualize the last five rows of the variance of the S&P 500.
-
-# In[ ]:
-
-
-# Calculate the variance of the S&P 500 using a rolling 60-day window.
-
-whale_navs_var_market_rolling60 = whale_navs_daily_returns['S&P 500'].rolling(window = 60).var()
-
-display(whale_navs_var_market_rolling60.tail())
-
-
-# #### For each of the two portfolios that you chose, complete the following steps:
-# 
-# 1. Using the 60-day rolling window, the daily return data, and the S&P 500 returns, calculate the covariance. Review the last five rows of the covariance of the portfolio.
-# 
-# 2. Calculate the beta of the portfolio. To do that, divide the covariance of the portfolio by the variance of the S&P 500.
-# 
-# 3. Use the Pandas `mean` function to calculate the average value of the 60-day rolling beta of the portfolio.
-# 
-# 4. Plot the 60-day rolling beta. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# ##### Portfolio 1 - Step 1: Using the 60-day rolling window, the daily return data, and the S&P 500 returns, calculate the covariance. Review the last five rows of the covariance of the portfolio.
-
-# In[ ]:
-
-
-# Calculate the covariance using a 60-day rolling window 
-# Review the last five rows of the covariance data
-
-fund1_selection = "BERKSHIRE HATHAWAY INC"
-
-whale_navs_cov_fund1_mkt_rolling60 = whale_navs_daily_returns_funds[fund1_selection].rolling(window = 60).cov(whale_navs_daily_returns['S&P 500'])
-
-display(whale_navs_cov_fund1_mkt_rolling60.tail())
-
-
-# ##### Portfolio 1 - Step 2: Calculate the beta of the portfolio. To do that, divide the covariance of the portfolio by the variance of the S&P 500.
-
-# In[ ]:
-
-
-# Calculate the beta based on the 60-day rolling covariance compared to the market (S&P 500)
-# Review the last five rows of the beta information
-
-whale_navs_cov_fund1_mkt_rolling60 = whale_navs_daily_returns_funds[fund1_selection].rolling(window = 60).cov(whale_navs_daily_returns['S&P 500'])
-whale_navs_beta_fund1_rolling60 = whale_navs_cov_fund1_mkt_rolling60 / whale_navs_var_market_rolling60
-
-display(whale_navs_beta_fund1_rolling60.tail())
-
-
-# ##### Portfolio 1 - Step 3: Use the Pandas `mean` function to calculate the average value of the 60-day rolling beta of the portfolio.
-
-# In[ ]:
-
-
-# Calculate the average of the 60-day rolling beta
-
-whale_navs_beta_fund1_rolling60_mean = whale_navs_beta_fund1_rolling60.mean()
-
-display(whale_navs_beta_fund1_rolling60_mean)
-
-
-# ##### Portfolio 1 - Step 4: Plot the 60-day rolling beta. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Plot the rolling beta 
-# Include a title parameter and adjust the figure size
-
-whale_navs_beta_fund1_rolling60.plot(
-    figsize = (15,10),
-    title = f"Whale NAVS Fund {fund1_selection}: Beta w/ Rolling Window = 60")
-
-
-# ##### Portfolio 2 - Step 1: Using the 60-day rolling window, the daily return data, and the S&P 500 returns, calculate the covariance. Review the last five rows of the covariance of the portfolio.
-
-# In[ ]:
-
-
-# Calculate the covariance using a 60-day rolling window 
-# Review the last five rows of the covariance data
-
-fund2_selection = "TIGER GLOBAL MANAGEMENT LLC"
-
-whale_navs_cov_fund2_mkt_rolling60 = whale_navs_daily_returns_funds[fund2_selection].rolling(window = 60).cov(whale_navs_daily_returns['S&P 500'])
-
-display(whale_navs_cov_fund2_mkt_rolling60.tail())
-
-
-# ##### Portfolio 2 - Step 2: Calculate the beta of the portfolio. To do that, divide the covariance of the portfolio by the variance of the S&P 500.
-
-# In[ ]:
-
-
-# Calculate the beta based on the 60-day rolling covariance compared to the market (S&P 500)
-# Review the last five rows of the beta information
-
-whale_navs_cov_fund2_mkt_rolling60 = whale_navs_daily_returns_funds[fund2_selection].rolling(window = 60).cov(whale_navs_daily_returns['S&P 500'])
-whale_navs_beta_fund2_rolling60 = whale_navs_cov_fund2_mkt_rolling60 / whale_navs_var_market_rolling60
-
-display(whale_navs_beta_fund2_rolling60.tail())
-
-
-# ##### Portfolio 2 - Step 3: Use the Pandas `mean` function to calculate the average value of the 60-day rolling beta of the portfolio.
-
-# In[ ]:
-
-
-# Calculate the average of the 60-day rolling beta
-
-whale_navs_beta_fund2_rolling60_mean = whale_navs_beta_fund2_rolling60.mean()
-
-display(whale_navs_beta_fund2_rolling60_mean)
-
-
-# ##### Portfolio 2 - Step 4: Plot the 60-day rolling beta. Be sure to include the `title` parameter, and adjust the figure size if necessary.
-
-# In[ ]:
-
-
-# Plot the rolling beta 
-# Include a title parameter and adjust the figure size
-
-whale_navs_beta_fund2_rolling60.plot(
-    figsize = (15,10),
-    title = f"Whale NAVS Fund {fund2_selection}: Beta w/ Rolling Window = 60")
-
-
-# -
-# -
-# ***EXTRA: ANALYZING ALL PORTFOLIOS (4 FUNDS) AT THE SAME TIME***
-# -
-# -
-
-# Portfolio ALL - Step 1: Using the 60-day rolling window, the daily return data, and the S&P 500 returns, calculate the covariance. Review the last five rows of the covariance of the portfolio.
-
-# In[ ]:
-
-
-# Calculate the covariance using a 60-day rolling window 
-# Review the last five rows of the covariance data
-
-whale_navs_cov_funds_mkt_rolling60 = whale_navs_daily_returns_funds.rolling(window = 60).cov(whale_navs_daily_returns['S&P 500'])
-display(whale_navs_cov_funds_mkt_rolling60.tail())
-
-
-# Portfolio ALL - Step 2: Calculate the beta of the portfolio. To do that, divide the covariance of the portfolio by the variance of the S&P 500.
-
-# In[ ]:
+def rolling_beta(returns, market=MARKET, window=60):
+    """Rolling beta of every fund column against the ``market`` column.
+
+    Equivalent to ``returns[fund].rolling(window).cov(returns[market]) /
+    returns[market].rolling(window).var()`` for every fund, computed for all
+    funds at once from running window sums in O(T * N).
+    """
+    funds = [name for name in returns.columns if name != market]
+    market_stats = _market_window_stats(returns[market].to_numpy(dtype=np.float64), window)
+    beta = _rolling_beta_block(returns[funds].to_numpy(dtype=np.float64), market_stats, window)
+    return pd.DataFrame(beta, index=returns.index, columns=funds)
+
+
+def _market_window_stats(mkt, window):
+    # Centered market returns (cov and var are shift invariant), their
+    # window sums and the unnormalized window variance Smm - Sm^2 / w
+    mkt = mkt - _column_center(mkt)
+    sum_m = _window_sums(mkt, window)
+    var_m = _window_sums(mkt * mkt, window)
+    var_m -= sum_m * sum_m / window
+    return mkt, sum_m, var_m
+
+
+def rolling_cov(returns, market=MARKET, window=60):
+    """Rolling covariance of every fund column with the ``market`` column.
+
+    Equivalent to ``returns[fund].rolling(window).cov(returns[market])`` for
+    every fund.
+    """
+    funds = [name for name in returns.columns if name != market]
+    market_stats = _market_window_stats(returns[market].to_numpy(dtype=np.float64), window)
+    cov = _rolling_cov_sums(returns[funds].to_numpy(dtype=np.float64), market_stats, window)
+    cov /= window - 1
+    return pd.DataFrame(cov, index=returns.index, columns=funds)
+
+
+def _rolling_cov_sums(values, market_stats, window):
+    # Unnormalized rolling covariance Sxm - Sx * Sm / w of a (dates x funds)
+    # float64 block with the market
+    mkt, sum_m, _ = market_stats
+    values = values - _column_center(values)
+
+    # Window sums of the funds and of their cross products with the market
+    sum_x = _window_sums(values, window)
+    values *= mkt[:, None]
+    cov = _window_sums(values, window)
+    sum_x *= (sum_m / window)[:, None]
+    cov -= sum_x
+    return cov
+
+
+def _rolling_beta_block(values, market_stats, window):
+    # Rolling beta of a (dates x funds) float64 block given the market stats:
+    # beta = (Sxm - Sx * Sm / w) / (Smm - Sm^2 / w); the 1 / (w - 1) cancels
+    beta = _rolling_cov_sums(values, market_stats, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta /= market_stats[2][:, None]
+    return beta
 
 
-# Calculate the beta based on the 60-day rolling covariance compared to the market (S&P 500)
-# Review the last five rows of the beta information
+# ---
+# Exponentially weighted (half-life) mode
+# ---
 
-# Create an empty dataframe to hold the resultant rolling betas
-whale_navs_beta_funds_rolling60 = pd.DataFrame()
-# Loop through the covariance dataframe, extract the fund name (column) and covariance data values
-#    and compute the rolling beta, and finally concatenate it to the resultant beta dataframe
-for (fund_name, fund_prices) in whale_navs_cov_funds_mkt_rolling60.iteritems():
-    whale_navs_beta_fund_rolling60 = fund_prices / whale_navs_var_market_rolling60
-    whale_navs_beta_funds_rolling60 = pd.concat([whale_navs_beta_funds_rolling60, 
-                                                 pd.DataFrame({fund_name: whale_navs_beta_fund_rolling60})], axis="columns")
-display(whale_navs_beta_funds_rolling60.tail())
+def ewm_decay(halflife):
+    """Per-day decay factor ``1 - alpha`` of a half-life in days."""
+    return 0.5 ** (1.0 / halflife)
+
+
+def _ewm_sums(block, decay, rows=16):
+    # Decayed running sums S_t = sum_{i<=t} decay^(t-i) x_i of a (dates x
+    # columns) block.  Equivalent to S_t = decay * S_{t-1} + x_t, but done
+    # ``rows`` dates at a time as one product with the lower-triangular
+    # matrix of decay powers plus the decayed carry of the previous block
+    sums = np.empty(block.shape)
+    steps = np.arange(rows)
+    lags = steps[:, None] - steps[None, :]
+    weights = np.where(lags >= 0, decay ** np.maximum(lags, 0), 0.0)
+    carry_weights = decay ** (steps + 1.0)
+    carry = np.zeros(block.shape[1:])
+    for start in range(0, block.shape[0], rows):
+        chunk = block[start:start + rows]
+        size = len(chunk)
+        out = sums[start:start + size]
+        np.matmul(weights[:size, :size], chunk, out=out)
+        out += np.multiply.outer(carry_weights[:size], carry)
+        carry = out[-1]
+    return sums
+
+
+def _ewm_weight_sums(valid, decay):
+    # Sum of the weights and of the squared weights after each date, per
+    # column of the (dates x columns) ``valid`` mask.  Gaps get no weight but
+    # still age the earlier returns (pandas' ignore_na=False); without gaps
+    # these are the closed forms of the geometric series
+    if valid.all():
+        steps = np.arange(1, len(valid) + 1)[:, None]
+        return ((1.0 - decay ** steps) / (1.0 - decay),
+                (1.0 - decay ** (2 * steps)) / (1.0 - decay * decay))
+    weights = valid.astype(np.float64)
+    return _ewm_sums(weights, decay), _ewm_sums(weights, decay * decay)
+
+
+def _ewm_debias(sum_w, sum_ww, count=None):
+    # Factor turning the weighted (biased) variance into the unbiased one;
+    # NaN where ``count`` (the observations so far) is below two, as the
+    # variance is undefined there
+    with np.errstate(divide="ignore", invalid="ignore"):
+        debias = sum_w * sum_w / (sum_w * sum_w - sum_ww)
+    if count is not None:
+        debias = np.where(count < 2, np.nan, debias)
+    return debias
+
+
+def _ewm_moments(values, valid, decay, sum_w):
+    # Decayed weighted means of the gap-filled (zero) values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _ewm_sums(np.where(valid, values, 0.0), decay) / sum_w
+
+
+def ewm_std(returns, halflife=21):
+    """Exponentially weighted standard deviation of every column.
+
+    Matches ``returns.ewm(halflife=halflife).std()``: every return is
+    weighted by ``0.5 ** (age / halflife)``, so old returns fade out instead
+    of dropping off the end of a window.  The decayed sums obey an O(1)
+    recursion per date and are evaluated for all columns at once.  Gaps
+    (NaN) carry no weight; a column is NaN until it has two returns.
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    values = values - _column_center(values)
+    valid = ~np.isnan(values)
+    decay = ewm_decay(halflife)
+    sum_w, sum_ww = _ewm_weight_sums(valid, decay)
+    mean = _ewm_moments(values, valid, decay, sum_w)
+    var = _ewm_moments(values * values, valid, decay, sum_w) - mean * mean
+    var *= _ewm_debias(sum_w, sum_ww, np.cumsum(valid, axis=0))
+    np.maximum(var, 0.0, out=var)
+    return pd.DataFrame(np.sqrt(var), index=returns.index, columns=returns.columns)
+
+
+def _ewm_cov_block(returns, market, halflife):
+    # Weighted (biased) covariance of every fund with the market, its
+    # unbiasing factor and the market's unbiased weighted variance.  The
+    # covariance of a fund uses the dates where both it and the market have
+    # a return; the market variance all dates where the market has one
+    funds = [name for name in returns.columns if name != market]
+    mkt = returns[market].to_numpy(dtype=np.float64)[:, None]
+    mkt = mkt - _column_center(mkt)
+    values = returns[funds].to_numpy(dtype=np.float64)
+    values = values - _column_center(values)
+    valid_m = ~np.isnan(mkt)
+    valid = ~np.isnan(values) & valid_m
+
+    decay = ewm_decay(halflife)
+    sum_w_m, sum_ww_m = _ewm_weight_sums(valid_m, decay)
+    mean_m = _ewm_moments(mkt, valid_m, decay, sum_w_m)
+    var_m = _ewm_moments(mkt * mkt, valid_m, decay, sum_w_m) - mean_m * mean_m
+    var_m *= _ewm_debias(sum_w_m, sum_ww_m, np.cumsum(valid_m, axis=0))
+
+    sum_w, sum_ww = _ewm_weight_sums(valid, decay)
+    mean_x = _ewm_moments(values, valid, decay, sum_w)
+    if valid.all():
+        mean_xm = mean_m
+    else:
+        # The market mean over each fund's own dates
+        mean_xm = _ewm_moments(np.broadcast_to(mkt, values.shape), valid, decay, sum_w)
+    cov = _ewm_moments(values * mkt, valid, decay, sum_w) - mean_x * mean_xm
+    return funds, cov, _ewm_debias(sum_w, sum_ww, np.cumsum(valid, axis=0)), var_m
+
+
+def ewm_cov(returns, market=MARKET, halflife=60):
+    """Exponentially weighted covariance of every fund column with the market.
+
+    Matches ``returns[fund].ewm(halflife=halflife).cov(returns[market])``.
+    """
+    funds, cov, debias, _ = _ewm_cov_block(returns, market, halflife)
+    cov *= debias
+    return pd.DataFrame(cov, index=returns.index, columns=funds)
+
+
+def ewm_beta(returns, market=MARKET, halflife=60):
+    """Exponentially weighted beta of every fund column against the market.
+
+    The half-life counterpart of ``rolling_beta``: the weighted covariance
+    with the market over the weighted market variance.
+    """
+    funds, cov, debias, var_m = _ewm_cov_block(returns, market, halflife)
+    cov *= debias
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov /= var_m
+    return pd.DataFrame(cov, index=returns.index, columns=funds)
 
 
-# Portfolio ALL - Step 3: Use the Pandas mean function to calculate the average value of the 60-day rolling beta of the portfolio.
+# ---
+# Plotting helpers (matplotlib is only imported by pandas when these run)
+# ---
 
-# In[ ]:
+def plot_daily_returns(metrics):
+    """Line plot of the daily returns of the funds and the market."""
+    return metrics.daily_returns.plot(
+        figsize = (10,7),
+        title = "Whale NAVS Fund Portfolio & Market: Daily Returns")
 
 
-# Calculate the average of the 60-day rolling beta
+def plot_cum_returns(metrics):
+    """Line plot of the cumulative returns of the funds and the market."""
+    return metrics.cum_returns.plot(
+        figsize = (10,7),
+        title = "Whale NAVS Fund Portfolio & Market: Cumulative Daily Returns")
 
-whale_navs_beta_funds_rolling60_mean = whale_navs_beta_funds_rolling60.mean()
-display(whale_navs_beta_funds_rolling60_mean)
 
+def plot_box(metrics, include_market=True):
+    """Box plot of the daily returns, optionally without the market."""
+    if include_market:
+        return metrics.daily_returns.plot(
+            kind = "box",
+            figsize = (15,20),
+            title = "Whale NAVS Fund Portfolio & Market: Daily Returns Box Plot")
+    return metrics.daily_returns[metrics.funds].plot(
+        kind = "box",
+        figsize = (15,10),
+        title = "Whale NAVS Fund Portfolio: Daily Returns Box Plot")
 
-# Portfolio ALL - Step 4: Plot the 60-day rolling beta. Be sure to include the title parameter, and adjust the figure size if necessary.
 
-# In[ ]:
+def plot_rolling_std(std_rolling, window=21):
+    """Line plot of a rolling standard deviation frame."""
+    scope = "Fund Portfolio & Market" if MARKET in std_rolling.columns else "Fund Portfolio"
+    return std_rolling.plot(
+        figsize = (15,10),
+        title = f"Whale NAVS {scope}: Daily Return Standard Deviation w/ Rolling Window = {window}")
 
 
-# Plot the rolling beta 
-# Include a title parameter and adjust the figure size
+def plot_sharpe(metrics):
+    """Bar chart of the annualized Sharpe ratios."""
+    return metrics.sharpe.plot(
+        kind = 'bar',
+        figsize = (10,7),
+        title = "Whale NAVS Fund Portfolio & Market: Annual Sharpe Ratio")
 
-whale_navs_beta_funds_rolling60.plot(
-    figsize = (15,10),
-    title = "Whale NAVS Fund Portfolio: Beta w/ Rolling Window = 60")
 
+def plot_beta(beta, window=60):
+    """Line plot of a rolling beta Series (one fund) or DataFrame (all funds)."""
+    if isinstance(beta, pd.Series):
+        title = f"Whale NAVS Fund {beta.name}: Beta w/ Rolling Window = {window}"
+    else:
+        title = f"Whale NAVS Fund Portfolio: Beta w/ Rolling Window = {window}"
+    return beta.plot(figsize = (15,10), title = title)
 
-# Answer the following two questions:
-# Which of the two portfolios seem more sensitive to movements in the S&P 500?
-# 
-# Which of the two portfolios do you recommend for inclusion in your firm’s suite of fund offerings?
-# 
-# Question 1 Which of the two portfolios seem more sensitive to movements in the S&P 500?
-# 
-# Answer 1 # fund1_selection = "BERKSHIRE HATHAWAY INC"
-# 
-# Question 2 Which of the two portfolios do you recommend for inclusion in your firm’s suite of fund offerings?
-# 
-# Answer 2 # fund1_selection = "BERKSHIRE HATHAWAY INC"
 
 # ---
+# Notebook walkthrough
+# ---
+
+def main(path=DEFAULT_NAV_PATH, plots=True):
+    """Run the notebook analysis end to end, printing each reviewed table.
+
+    Each phase is wrapped in ``instrumentation.phase`` so it is timed when a
+    profiler has been enabled (and costs nothing otherwise).
+    """
+    from instrumentation import phase
+
+    # Import the data and convert the NAVs and prices to daily returns
+    with phase("Import") as record:
+        whale_navs_prices = load_navs(path)
+        print(whale_navs_prices.head())
+
+        metrics = compute_risk_metrics(whale_navs_prices)
+        whale_navs_daily_returns = metrics.daily_returns
+        print(whale_navs_daily_returns.head())
+        if record is not None:
+            record.rows = len(whale_navs_prices)
+    rows = len(whale_navs_daily_returns)
+
+    # Analyze the Performance
+    with phase("Performance", rows):
+        print(metrics.cum_returns.tail())
+        if plots:
+            plot_daily_returns(metrics)
+            plot_cum_returns(metrics)
+
+    # Analyze the Volatility
+    with phase("Volatility", rows):
+        if plots:
+            plot_box(metrics)
+            plot_box(metrics, include_market=False)
+
+    # Analyze the Risk: daily and annualized standard deviation, 21-day rolling std
+    with phase("Risk", rows):
+        print(metrics.std.sort_values())
+        print(metrics.ann_std.sort_values())
+        whale_navs_std_rolling21 = rolling_std(whale_navs_daily_returns, window = 21)
+        if plots:
+            plot_rolling_std(whale_navs_std_rolling21)
+            plot_rolling_std(whale_navs_std_rolling21[metrics.funds])
+
+    # Analyze the Risk-Return Profile: annualized average returns and Sharpe ratios
+    with phase("Risk-Return", rows):
+        print(metrics.ann_mean.sort_values())
+        print(metrics.sharpe.sort_values())
+        if plots:
+            plot_sharpe(metrics)
+
+    # Diversify the Portfolio: 60-day rolling variance of the market and
+    # covariance / beta of the two selected funds
+    with phase("Diversify", rows):
+        whale_navs_var_market_rolling60 = whale_navs_daily_returns[MARKET].rolling(window = 60).var()
+        print(whale_navs_var_market_rolling60.tail())
+
+        for fund_selection in ("BERKSHIRE HATHAWAY INC", "TIGER GLOBAL MANAGEMENT LLC"):
+            whale_navs_cov_fund_mkt_rolling60 = whale_navs_daily_returns[fund_selection].rolling(window = 60).cov(whale_navs_daily_returns[MARKET])
+            whale_navs_beta_fund_rolling60 = whale_navs_cov_fund_mkt_rolling60 / whale_navs_var_market_rolling60
+            whale_navs_beta_fund_rolling60.name = fund_selection
+            print(whale_navs_cov_fund_mkt_rolling60.tail())
+            print(whale_navs_beta_fund_rolling60.tail())
+            print(whale_navs_beta_fund_rolling60.mean())
+            if plots:
+                plot_beta(whale_navs_beta_fund_rolling60)
+
+        # Extra: 60-day rolling beta and its average for all funds at the same time
+        whale_navs_beta_funds_rolling60 = rolling_beta(whale_navs_daily_returns, window = 60)
+        print(whale_navs_beta_funds_rolling60.tail())
+        print(whale_navs_beta_funds_rolling60.mean())
+        if plots:
+            plot_beta(whale_navs_beta_funds_rolling60)
+
+    if plots:
+        import matplotlib.pyplot as plt
+        plt.show()
+
+    return metrics
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Headless ``risk-return`` command line for batch and cron runs.
+
+Runs the notebook pipeline on a NAV file without Jupyter or a display::
+
+    python -m risk_return_cli Resources/whale_navs.csv -o reports --format csv json
+    python risk_return_cli.py navs.csv -o reports --format parquet --no-plots
+
+Tables written to the output directory (one file per table and format):
+
+* ``summary``          - std, ann_std, ann_mean and sharpe of every column
+* ``daily_returns`` / ``cum_returns``
+* ``std_rolling<w>``   - rolling std of every column
+* ``beta_rolling<w>``  - rolling beta of every fund against the market
+
+The notebook figures are rendered with matplotlib's Agg backend into
+``<output>/plots/*.png``, spread over a process pool (``--plot-workers``),
+or skipped with ``--no-plots``.
+
+Exit status: 0 on success, 1 when the pipeline fails (unreadable NAV file,
+missing market column, failed write), 2 on usage errors and 3 when the
+tables were written but one or more figures could not be rendered.
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import risk_return_analysis as rra
+
+
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+EXIT_PLOTS = 3
+
+FORMATS = ("csv", "parquet", "json")
+BETA_FUNDS = ("BERKSHIRE HATHAWAY INC", "TIGER GLOBAL MANAGEMENT LLC")
+
+
+# ---
+# Pipeline and table output
+# ---
+
+def run_pipeline(path, market=rra.MARKET, std_window=21, beta_window=60,
+                 num_trading_days=rra.NUM_TRADING_DAYS):
+    """Load ``path`` and compute every table; returns ``(metrics, tables)``."""
+    prices = rra.load_navs(path)
+    if market not in prices.columns:
+        raise ValueError(f"market column {market!r} not in {path}")
+    metrics = rra.compute_risk_metrics(prices, num_trading_days)
+    summary = pd.DataFrame({
+        "std": metrics.std,
+        "ann_std": metrics.ann_std,
+        "ann_mean": metrics.ann_mean,
+        "sharpe": metrics.sharpe,
+    })
+    tables = {
+        "summary": summary,
+        "daily_returns": metrics.daily_returns,
+        "cum_returns": metrics.cum_returns,
+        f"std_rolling{std_window}": rra.rolling_std(metrics.daily_returns, std_window),
+        f"beta_rolling{beta_window}": rra.rolling_beta(metrics.daily_returns, market, beta_window),
+    }
+    return metrics, tables
+
+
+def write_table(frame, path_stem, fmt):
+    """Write one table as ``<path_stem>.<fmt>``; returns the path."""
+    path = path_stem.with_suffix(f".{fmt}")
+    if fmt == "csv":
+        frame.to_csv(path)
+    elif fmt == "parquet":
+        # Needs pyarrow or fastparquet; an ImportError is reported as a failure
+        frame.to_parquet(path)
+    elif fmt == "json":
+        frame.to_json(path, orient="split", date_format="iso", double_precision=15)
+    else:
+        raise ValueError(f"unknown format {fmt!r}")
+    return path
+
+
+# ---
+# Figures (rendered with the Agg backend, in this process or pool workers)
+# ---
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+_FIGURES = {
+    "daily_returns": lambda data, _: rra.plot_daily_returns(data["metrics"]),
+    "cum_returns": lambda data, _: rra.plot_cum_returns(data["metrics"]),
+    "box": lambda data, _: rra.plot_box(data["metrics"]),
+    "box_funds": lambda data, _: rra.plot_box(data["metrics"], include_market=False),
+    "std_rolling": lambda data, _: rra.plot_rolling_std(data["std_rolling"], data["std_window"]),
+    "std_rolling_funds": lambda data, _: rra.plot_rolling_std(
+        data["std_rolling"][data["metrics"].funds], data["std_window"]),
+    "sharpe": lambda data, _: rra.plot_sharpe(data["metrics"]),
+    "beta_rolling": lambda data, fund: rra.plot_beta(
+        data["beta"] if fund is None else data["beta"][fund], data["beta_window"]),
+}
+
+_worker_data = None
+
+
+def _init_worker(data):
+    # Pool initializer: select the Agg backend before pyplot is imported and
+    # receive the frames once per worker, not once per figure
+    global _worker_data
+    import matplotlib
+    matplotlib.use("Agg")
+    _worker_data = data
+
+
+def _render(job, data=None):
+    # Render one figure to PNG; returns (file name, error message or None)
+    name, figure, fund = job
+    data = data if data is not None else _worker_data
+    path = data["plot_dir"] / f"{name}.png"
+    try:
+        import matplotlib.pyplot as plt
+        axes = _FIGURES[figure](data, fund)
+        fig = axes.get_figure()
+        fig.savefig(path, dpi=data["dpi"], bbox_inches="tight")
+        plt.close(fig)
+    except Exception as exc:
+        return path.name, f"{type(exc).__name__}: {exc}"
+    return path.name, None
+
+
+def figure_jobs(funds, beta_window=60):
+    """(file name, figure, fund) for every notebook figure."""
+    jobs = [(figure, figure, None) for figure in _FIGURES if figure != "beta_rolling"]
+    jobs += [(f"beta_rolling{beta_window}_{_slug(fund)}", "beta_rolling", fund)
+             for fund in BETA_FUNDS if fund in funds]
+    jobs.append((f"beta_rolling{beta_window}", "beta_rolling", None))
+    return jobs
+
+
+def render_plots(metrics, tables, plot_dir, std_window=21, beta_window=60, workers=None, dpi=100):
+    """Render every figure into ``plot_dir``; returns ``(written, failures)``."""
+    plot_dir.mkdir(parents=True, exist_ok=True)
+    data = {
+        "metrics": metrics,
+        "std_rolling": tables[f"std_rolling{std_window}"],
+        "beta": tables[f"beta_rolling{beta_window}"],
+        "std_window": std_window,
+        "beta_window": beta_window,
+        "plot_dir": plot_dir,
+        "dpi": dpi,
+    }
+    jobs = figure_jobs(metrics.funds, beta_window)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        _init_worker(None)
+        results = [_render(job, data) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data,)) as pool:
+            results = list(pool.map(_render, jobs))
+    written = [plot_dir / name for name, error in results if error is None]
+    failures = [(name, error) for name, error in results if error is not None]
+    return written, failures
+
+
+# ---
+# Entry point
+# ---
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="risk-return", description="Headless whale NAV risk / return report.")
+    parser.add_argument("nav_path", nargs="?", type=Path, default=rra.DEFAULT_NAV_PATH,
+                        help="NAV price CSV with a date column (default: %(default)s)")
+    parser.add_argument("-o", "--output-dir", type=Path, default=Path("reports"),
+                        help="directory for the tables and plots (default: %(default)s)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["csv"],
+                        dest="formats", help="table formats to write (default: csv)")
+    parser.add_argument("--no-plots", action="store_true", help="do not render figures")
+    parser.add_argument("--plot-workers", type=int, default=None,
+                        help="processes rendering figures (default: CPU count)")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--market", default=rra.MARKET)
+    parser.add_argument("--std-window", type=int, default=21)
+    parser.add_argument("--beta-window", type=int, default=60)
+    parser.add_argument("--num-trading-days", type=int, default=rra.NUM_TRADING_DAYS)
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # parser.error prints the usage and exits with EXIT_USAGE (2)
+    if min(args.std_window, args.beta_window) < 2:
+        parser.error("--std-window and --beta-window must be >= 2")
+    if args.plot_workers is not None and args.plot_workers < 1:
+        parser.error("--plot-workers must be >= 1")
+
+    def report(message):
+        if not args.quiet:
+            print(message)
+
+    start = time.perf_counter()
+    try:
+        metrics, tables = run_pipeline(args.nav_path, args.market, args.std_window,
+                                       args.beta_window, args.num_trading_days)
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+        for name, frame in tables.items():
+            for fmt in args.formats:
+                report(f"wrote {write_table(frame, args.output_dir / name, fmt)}")
+    except (OSError, ValueError, ImportError, KeyError) as exc:
+        print(f"risk-return: {type(exc).__name__}: {exc}", file=sys.stderr)
+        return EXIT_FAILURE
+
+    status = EXIT_OK
+    if not args.no_plots:
+        # Fail early, before starting workers
+        if importlib.util.find_spec("matplotlib") is None:
+            print("risk-return: matplotlib is not installed; use --no-plots", file=sys.stderr)
+            return EXIT_PLOTS
+        written, failures = render_plots(metrics, tables, args.output_dir / "plots",
+                                         args.std_window, args.beta_window,
+                                         args.plot_workers, args.dpi)
+        for path in written:
+            report(f"wrote {path}")
+        for name, error in failures:
+            print(f"risk-return: could not render {name}: {error}", file=sys.stderr)
+        if failures:
+            status = EXIT_PLOTS
+
+    report(f"done in {time.perf_counter() - start:.2f}s")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""Incremental risk metrics for daily NAV ticks.
+
+``RiskStream`` keeps just enough state to update the metrics of
+``risk_return_analysis`` one NAV row at a time instead of re-reading the
+whole price history: the previous prices, the cumulative growth, Welford
+running mean/variance and a ring buffer of the last returns from which the
+rolling std (21 days by default) and the rolling cov/var/beta against the
+market (60 days by default) are maintained with add/remove running sums.
+With ``std_halflife`` / ``beta_halflife`` the stream also keeps exponentially
+weighted std / cov / beta (see ``risk_return_analysis.ewm_std``), whose
+decayed sums need no buffer at all.  Each tick costs O(funds).
+
+The state can be saved with ``snapshot``/``save`` and resumed with
+``restore``/``load`` so a restarted process does not replay history::
+
+    stream = RiskStream.from_prices(rra.load_navs())
+    stream.save("risk_state.npz")
+    ...
+    stream = RiskStream.load("risk_state.npz")
+    stream.update(todays_navs)
+    stream.metrics()
+"""
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import MARKET, NUM_TRADING_DAYS, _ewm_debias, ewm_decay
+
+
+class RiskStream:
+    """Stateful risk metrics updated one NAV row at a time."""
+
+    def __init__(self, columns, market=MARKET, std_window=21, beta_window=60,
+                 num_trading_days=NUM_TRADING_DAYS, std_halflife=None, beta_halflife=None):
+        self.columns = list(columns)
+        if market not in self.columns:
+            raise ValueError(f"market column {market!r} not in columns")
+        self.market = market
+        self.std_window = int(std_window)
+        self.beta_window = int(beta_window)
+        self.num_trading_days = num_trading_days
+        self.std_halflife = std_halflife
+        self.beta_halflife = beta_halflife
+
+        n = len(self.columns)
+        self._market_pos = self.columns.index(market)
+        self._capacity = max(self.std_window, self.beta_window)
+
+        # Price and return state
+        self.last_prices = np.full(n, np.nan)
+        self.last_date = None
+        self.daily_return = np.full(n, np.nan)
+        self.growth = np.ones(n)
+
+        # Welford running mean / sum of squared deviations over all returns
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+
+        # Ring buffer of the last returns and the running window sums
+        self.buffer = np.zeros((self._capacity, n))
+        self.std_sum = np.zeros(n)
+        self.std_sumsq = np.zeros(n)
+        self.beta_sum = np.zeros(n)
+        self.beta_sumprod = np.zeros(n)
+
+        # Exponentially weighted sums: [sum of weights, sum of squared
+        # weights] and the decayed sums of the returns / products
+        self.ewm_std_weights = np.zeros(2)
+        self.ewm_std_sum = np.zeros(n)
+        self.ewm_std_sumsq = np.zeros(n)
+        self.ewm_beta_weights = np.zeros(2)
+        self.ewm_beta_sum = np.zeros(n)
+        self.ewm_beta_sumprod = np.zeros(n)
+
+    @classmethod
+    def from_prices(cls, prices, **kwargs):
+        """Create a stream primed with every row of a NAV price DataFrame."""
+        stream = cls(prices.columns, **kwargs)
+        stream.update_many(prices)
+        return stream
+
+    # ---
+    # Updates
+    # ---
+
+    def update(self, navs, date=None):
+        """Add one NAV row (a Series keyed by column or an array in column order).
+
+        Returns ``True`` if the row produced a valid daily return for every
+        column.  As with ``pct_change().dropna()``, a row with any missing
+        price (or following one) is skipped.
+        """
+        if isinstance(navs, pd.Series):
+            if date is None:
+                date = navs.name
+            navs = navs.reindex(self.columns)
+        prices = np.asarray(navs, dtype=np.float64)
+        if prices.shape != self.last_prices.shape:
+            raise ValueError(f"expected {len(self.columns)} prices, got shape {prices.shape}")
+
+        returns = prices / self.last_prices - 1.0
+        self.last_prices = prices
+        self.last_date = date
+        if not np.isfinite(returns).all():
+            return False
+        self._add_returns(returns)
+        return True
+
+    def update_many(self, prices):
+        """Add several NAV rows from a DataFrame (or a 2-D array in column order)."""
+        if isinstance(prices, pd.DataFrame):
+            dates = prices.index
+            prices = prices[self.columns].to_numpy(dtype=np.float64)
+        else:
+            prices = np.asarray(prices, dtype=np.float64)
+            dates = [None] * len(prices)
+        for date, row in zip(dates, prices):
+            self.update(row, date=date)
+        return self
+
+    def _add_returns(self, returns):
+        self.daily_return = returns
+        self.growth *= 1.0 + returns
+
+        # Welford update of the running mean and variance
+        self.count += 1
+        delta = returns - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (returns - self.mean)
+
+        # Slide the rolling windows: drop the return leaving each window
+        # (if it is full) and add the new one
+        mkt = self._market_pos
+        slot = (self.count - 1) % self._capacity
+        if self.count > self.std_window:
+            old = self.buffer[(self.count - 1 - self.std_window) % self._capacity]
+            self.std_sum -= old
+            self.std_sumsq -= old * old
+        if self.count > self.beta_window:
+            old = self.buffer[(self.count - 1 - self.beta_window) % self._capacity]
+            self.beta_sum -= old
+            self.beta_sumprod -= old * old[mkt]
+        self.buffer[slot] = returns
+        self.std_sum += returns
+        self.std_sumsq += returns * returns
+        self.beta_sum += returns
+        self.beta_sumprod += returns * returns[mkt]
+
+        # Decay the exponentially weighted sums and add the new return
+        if self.std_halflife is not None:
+            decay = ewm_decay(self.std_halflife)
+            self._decay_weights(self.ewm_std_weights, decay)
+            self.ewm_std_sum *= decay
+            self.ewm_std_sum += returns
+            self.ewm_std_sumsq *= decay
+            self.ewm_std_sumsq += returns * returns
+        if self.beta_halflife is not None:
+            decay = ewm_decay(self.beta_halflife)
+            self._decay_weights(self.ewm_beta_weights, decay)
+            self.ewm_beta_sum *= decay
+            self.ewm_beta_sum += returns
+            self.ewm_beta_sumprod *= decay
+            self.ewm_beta_sumprod += returns * returns[mkt]
+
+        # Periodically rebuild the running sums from the buffer so that
+        # add/remove rounding error cannot accumulate
+        if self.count % self._capacity == 0:
+            self._resync()
+
+    @staticmethod
+    def _decay_weights(weights, decay):
+        weights[0] = weights[0] * decay + 1.0
+        weights[1] = weights[1] * decay * decay + 1.0
+
+    def _resync(self):
+        std_rows = self._window_rows(self.std_window)
+        self.std_sum = std_rows.sum(axis=0)
+        self.std_sumsq = (std_rows * std_rows).sum(axis=0)
+        beta_rows = self._window_rows(self.beta_window)
+        self.beta_sum = beta_rows.sum(axis=0)
+        self.beta_sumprod = (beta_rows * beta_rows[:, self._market_pos, None]).sum(axis=0)
+
+    def _window_rows(self, window):
+        # The last min(count, window) returns in the buffer
+        size = min(self.count, window)
+        slots = (np.arange(self.count - size, self.count)) % self._capacity
+        return self.buffer[slots]
+
+    # ---
+    # Metrics
+    # ---
+
+    @property
+    def cum_return(self):
+        return self.growth - 1.0
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return np.full(len(self.columns), np.nan)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    @property
+    def ann_std(self):
+        return self.std * np.sqrt(self.num_trading_days)
+
+    @property
+    def ann_mean(self):
+        return self.mean * self.num_trading_days
+
+    @property
+    def sharpe(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.ann_mean / self.ann_std
+
+    @property
+    def rolling_std(self):
+        window = self.std_window
+        if self.count < window:
+            return np.full(len(self.columns), np.nan)
+        var = (self.std_sumsq - self.std_sum * self.std_sum / window) / (window - 1)
+        return np.sqrt(np.maximum(var, 0.0))
+
+    @property
+    def rolling_cov(self):
+        """Rolling covariance of every column with the market (var for the market)."""
+        window = self.beta_window
+        if self.count < window:
+            return np.full(len(self.columns), np.nan)
+        sum_m = self.beta_sum[self._market_pos]
+        return (self.beta_sumprod - self.beta_sum * sum_m / window) / (window - 1)
+
+    @property
+    def rolling_beta(self):
+        cov = self.rolling_cov
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return cov / cov[self._market_pos]
+
+    @property
+    def ewm_std(self):
+        """Exponentially weighted std (``ewm(halflife=std_halflife).std()``)."""
+        if self.std_halflife is None or self.count < 2:
+            return np.full(len(self.columns), np.nan)
+        sum_w, sum_ww = self.ewm_std_weights
+        mean = self.ewm_std_sum / sum_w
+        var = (self.ewm_std_sumsq / sum_w - mean * mean) * _ewm_debias(sum_w, sum_ww)
+        return np.sqrt(np.maximum(var, 0.0))
+
+    @property
+    def ewm_cov(self):
+        """Exponentially weighted covariance of every column with the market."""
+        if self.beta_halflife is None or self.count < 2:
+            return np.full(len(self.columns), np.nan)
+        sum_w, sum_ww = self.ewm_beta_weights
+        mean = self.ewm_beta_sum / sum_w
+        cov = self.ewm_beta_sumprod / sum_w - mean * mean[self._market_pos]
+        return cov * _ewm_debias(sum_w, sum_ww)
+
+    @property
+    def ewm_beta(self):
+        cov = self.ewm_cov
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return cov / cov[self._market_pos]
+
+    def metrics(self):
+        """Latest metrics as a DataFrame with one row per column."""
+        metrics = pd.DataFrame({
+            "daily_return": self.daily_return,
+            "cum_return": self.cum_return,
+            "std": self.std,
+            "ann_std": self.ann_std,
+            "ann_mean": self.ann_mean,
+            "sharpe": self.sharpe,
+            f"std_rolling{self.std_window}": self.rolling_std,
+            f"cov_rolling{self.beta_window}": self.rolling_cov,
+            f"beta_rolling{self.beta_window}": self.rolling_beta,
+        }, index=self.columns)
+        if self.std_halflife is not None:
+            metrics[f"std_ewm{self.std_halflife:g}"] = self.ewm_std
+        if self.beta_halflife is not None:
+            metrics[f"cov_ewm{self.beta_halflife:g}"] = self.ewm_cov
+            metrics[f"beta_ewm{self.beta_halflife:g}"] = self.ewm_beta
+        return metrics
+
+    # ---
+    # Snapshot / restore
+    # ---
+
+    _STATE = ("last_prices", "daily_return", "growth", "mean", "m2", "buffer",
+              "std_sum", "std_sumsq", "beta_sum", "beta_sumprod",
+              "ewm_std_weights", "ewm_std_sum", "ewm_std_sumsq",
+              "ewm_beta_weights", "ewm_beta_sum", "ewm_beta_sumprod")
+
+    def snapshot(self):
+        """Plain dict of the stream state (NumPy arrays and scalars)."""
+        state = {name: getattr(self, name).copy() for name in self._STATE}
+        state.update(
+            columns=np.array(self.columns, dtype=str),
+            market=self.market,
+            std_window=self.std_window,
+            beta_window=self.beta_window,
+            num_trading_days=self.num_trading_days,
+            # NaN stands for "no half-life" so the .npz needs no pickled None
+            std_halflife=np.nan if self.std_halflife is None else self.std_halflife,
+            beta_halflife=np.nan if self.beta_halflife is None else self.beta_halflife,
+            count=self.count,
+            last_date=None if self.last_date is None else str(self.last_date),
+        )
+        return state
+
+    @classmethod
+    def restore(cls, state):
+        """Recreate a stream from a ``snapshot`` dict."""
+        stream = cls(
+            [str(name) for name in state["columns"]],
+            market=str(state["market"]),
+            std_window=int(state["std_window"]),
+            beta_window=int(state["beta_window"]),
+            # .item() keeps the stored type: 252 stays an int, 365.25 a float
+            num_trading_days=np.asarray(state["num_trading_days"]).item(),
+            std_halflife=_halflife(state.get("std_halflife")),
+            beta_halflife=_halflife(state.get("beta_halflife")),
+        )
+        for name in cls._STATE:
+            if name in state:
+                setattr(stream, name, np.array(state[name], dtype=np.float64))
+        stream.count = int(state["count"])
+        last_date = state.get("last_date")
+        if last_date is not None and str(last_date) != "":
+            stream.last_date = pd.Timestamp(str(last_date))
+        return stream
+
+    def save(self, path):
+        """Write the snapshot to an ``.npz`` file."""
+        state = self.snapshot()
+        if state["last_date"] is None:
+            state["last_date"] = ""
+        np.savez(path, **state)
+
+    @classmethod
+    def load(cls, path):
+        """Resume a stream saved with ``save``."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls.restore({name: data[name] for name in data.files})
+
+
+def _halflife(value):
+    # Snapshot half-life back to a float (or None when it was not set)
+    if value is None or np.isnan(float(value)):
+        return None
+    return float(value)
@@ -0,0 +1,128 @@
+"""Rolling std, cov and beta for many window lengths in one pass.
+
+The notebook hard-codes a 21-day window for the rolling std and a 60-day
+window for the rolling beta.  ``risk_surface`` takes a list of windows and
+builds the prefix sums of the (centered) returns, squared returns and
+cross-products with the market once; every window is then one difference of
+those prefix sums, so a term structure of five windows costs about the same
+as the prefix sums plus five subtractions rather than five rolling passes.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from risk_return_analysis import MARKET, _column_center
+
+
+DEFAULT_WINDOWS = (5, 21, 60, 126, 252)
+
+
+@dataclass
+class RiskSurface:
+    """Rolling metrics stacked as (window x date x column) arrays.
+
+    ``std`` covers every column (``columns``, market included); ``cov`` and
+    ``beta`` cover the fund columns (``funds``) against the market.  Rows
+    before a window is full are NaN.
+    """
+
+    windows: tuple
+    index: pd.Index
+    columns: list
+    funds: list
+    std: np.ndarray
+    cov: np.ndarray
+    beta: np.ndarray
+
+    def frame(self, metric, window):
+        """One window of ``metric`` ("std", "cov" or "beta") as a DataFrame."""
+        layer = getattr(self, metric)[self.windows.index(window)]
+        columns = self.columns if metric == "std" else self.funds
+        return pd.DataFrame(layer, index=self.index, columns=columns)
+
+    def term_structure(self, metric, date=None):
+        """``metric`` on one date (default: the last) as a (window x column) DataFrame."""
+        row = -1 if date is None else self.index.get_loc(date)
+        columns = self.columns if metric == "std" else self.funds
+        return pd.DataFrame(getattr(self, metric)[:, row], index=list(self.windows), columns=columns)
+
+
+def _prefix_sums(block):
+    # Cumulative sums along the dates with a leading zero row, so the sum of
+    # rows (t - w, t] is prefix[t + 1] - prefix[t + 1 - w].  Gaps (NaN) are
+    # summed as zero and counted in a second prefix array (None without gaps)
+    missing = np.isnan(block)
+    gaps = None
+    if missing.any():
+        block = np.where(missing, 0.0, block)
+        gaps = np.zeros((block.shape[0] + 1,) + block.shape[1:], dtype=np.int32)
+        np.cumsum(missing, axis=0, out=gaps[1:])
+    prefix = np.empty((block.shape[0] + 1,) + block.shape[1:])
+    prefix[0] = 0.0
+    np.cumsum(block, axis=0, out=prefix[1:])
+    return prefix, gaps
+
+
+def _window_diff(prefix, window, out):
+    # Write the trailing window sums into ``out`` (NaN before the window is
+    # full and for windows containing a gap, like pandas' min_periods=window)
+    prefix, gaps = prefix
+    out[:window - 1] = np.nan
+    np.subtract(prefix[window:], prefix[:-window], out=out[window - 1:])
+    if gaps is not None:
+        out[window - 1:][gaps[window:] - gaps[:-window] > 0] = np.nan
+    return out
+
+
+def risk_surface(returns, windows=DEFAULT_WINDOWS, market=MARKET):
+    """Rolling std, cov and beta of ``returns`` for every window in ``windows``."""
+    windows = tuple(int(window) for window in windows)
+    if min(windows) < 2:
+        raise ValueError("windows must be at least 2 rows long")
+    columns = list(returns.columns)
+    market_pos = columns.index(market)
+    funds = columns[:market_pos] + columns[market_pos + 1:]
+
+    # Center every column on its full-sample mean (the rolling moments are
+    # shift invariant) and take the prefix sums once for all windows; gaps
+    # from ``masked_returns`` only blank the windows that contain them
+    values = returns.to_numpy(dtype=np.float64)
+    values = values - _column_center(values)
+    mkt = values[:, market_pos]
+    fund_values = np.delete(values, market_pos, axis=1)
+    prefix_x = _prefix_sums(values)
+    prefix_xx = _prefix_sums(values * values)
+    prefix_xm = _prefix_sums(fund_values * mkt[:, None])
+
+    dates = len(values)
+    std = np.empty((len(windows), dates, len(columns)))
+    cov = np.empty((len(windows), dates, len(funds)))
+    beta = np.empty((len(windows), dates, len(funds)))
+    fund_pos = [pos for pos in range(len(columns)) if pos != market_pos]
+    sum_x = np.empty((dates, len(columns)))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for layer, window in enumerate(windows):
+            if window > dates:
+                std[layer] = cov[layer] = beta[layer] = np.nan
+                continue
+
+            # std: (Sxx - Sx^2 / w) / (w - 1)
+            _window_diff(prefix_x, window, sum_x)
+            var = _window_diff(prefix_xx, window, std[layer])
+            var -= sum_x * sum_x / window
+            var_m = var[:, market_pos].copy()
+
+            # cov: (Sxm - Sx * Sm / w) / (w - 1); beta = cov / var(market)
+            cov_layer = _window_diff(prefix_xm, window, cov[layer])
+            cov_layer -= sum_x[:, fund_pos] * (sum_x[:, market_pos] / window)[:, None]
+            np.divide(cov_layer, var_m[:, None], out=beta[layer])
+            cov_layer /= window - 1
+
+            var /= window - 1
+            np.maximum(var, 0.0, out=var)
+            np.sqrt(var, out=var)
+
+    return RiskSurface(windows, returns.index, columns, funds, std, cov, beta)
@@ -0,0 +1,230 @@
+"""Rolling fund-to-fund covariance / correlation matrices.
+
+The notebook only compares each fund with the S&P 500, but diversification
+depends on how the funds move with each other.  ``RollingCorrelation`` keeps
+the window sum and the window cross-product matrix ``sum x x'`` of the
+returns and updates both with one rank-one addition for the new row and one
+rank-one removal for the row leaving the window: O(N^2) per date instead of
+the O(w * N^2) of recomputing the window.  The cross products are rebuilt from
+the ring buffer once per window to stop rounding drift from accumulating.
+Gaps (NaN, e.g. from ``masked_returns``) are added to the sums as zero and
+counted per column, so only the pairs whose window holds a gap are NaN, as
+with pandas' ``rolling(window).corr()``.
+
+``rolling_correlation`` runs it over a returns frame and stores each date's
+matrix compactly as its strict upper triangle (optionally float32, a quarter
+of pandas' MultiIndex ``rolling().corr()`` output), or keeps only the top-k
+most correlated pairs per date when even the triangles are too large.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+class RollingCorrelation:
+    """Incrementally updated rolling covariance / correlation of N series."""
+
+    def __init__(self, columns, window=60):
+        self.columns = list(columns)
+        self.window = int(window)
+        n = len(self.columns)
+        self.count = 0
+        self.shift = np.full(n, np.nan)
+        self.buffer = np.zeros((self.window, n))
+        self.missing = np.zeros((self.window, n), dtype=bool)
+        self.gaps = np.zeros(n, dtype=np.int64)
+        self.sums = np.zeros(n)
+        self.products = np.zeros((n, n))
+
+    def update(self, row):
+        """Add one row of returns (in column order), dropping the oldest if full."""
+        row = np.asarray(row, dtype=np.float64)
+        # Shift each column by its first finite value so the running sums
+        # stay small; earlier rows of that column are all gaps (zero)
+        unset = np.isnan(self.shift) & ~np.isnan(row)
+        self.shift[unset] = row[unset]
+        x = row - self.shift
+        missing = np.isnan(x)
+        x[missing] = 0.0
+        slot = self.count % self.window
+        if self.count >= self.window:
+            old = self.buffer[slot]
+            self.sums -= old
+            self.products -= np.outer(old, old)
+            self.gaps -= self.missing[slot]
+        self.buffer[slot] = x
+        self.missing[slot] = missing
+        self.sums += x
+        self.products += np.outer(x, x)
+        self.gaps += missing
+        self.count += 1
+        if self.count % self.window == 0:
+            self.sums = self.buffer.sum(axis=0)
+            self.products = self.buffer.T @ self.buffer
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    def cov(self):
+        """Current window covariance matrix.
+
+        NaN until the window is full, and in the rows and columns of funds
+        with a gap in the window.
+        """
+        if not self.ready:
+            return np.full(self.products.shape, np.nan)
+        w = self.window
+        cov = (self.products - np.outer(self.sums, self.sums) / w) / (w - 1)
+        gapped = self.gaps > 0
+        if gapped.any():
+            cov[gapped] = np.nan
+            cov[:, gapped] = np.nan
+        return cov
+
+    def corr(self):
+        """Current window correlation matrix (NaN until the window is full)."""
+        cov = self.cov()
+        std = np.sqrt(np.maximum(np.diag(cov), 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        np.clip(corr, -1.0, 1.0, out=corr)
+        return corr
+
+
+@dataclass
+class RollingCorrelationResult:
+    """Rolling matrices stored as strict upper triangles.
+
+    ``triangles`` is a (date x pair) array (``None`` in top-k only mode) whose
+    pair order is ``np.triu_indices(len(columns), 1)``; for ``kind="cov"``
+    ``variances`` holds the (date x column) diagonal alongside it.
+    ``top_pairs`` holds the ``top_k`` pairs of every date (ranked by
+    absolute value if ``absolute``) when requested.
+    """
+
+    index: pd.Index
+    columns: list
+    window: int
+    kind: str
+    triangles: np.ndarray
+    top_pairs: pd.DataFrame
+    top_k: int = None
+    absolute: bool = False
+    variances: np.ndarray = None
+
+    def pairs(self):
+        """The (row, column) fund positions of each triangle entry."""
+        return np.triu_indices(len(self.columns), 1)
+
+    def matrix(self, date):
+        """Full symmetric matrix on ``date`` as a DataFrame."""
+        if self.triangles is None:
+            raise ValueError("triangles were not stored (top-k only mode)")
+        n = len(self.columns)
+        row = self.triangles[self.index.get_loc(date)].astype(np.float64)
+        matrix = np.empty((n, n))
+        upper = self.pairs()
+        matrix[upper] = row
+        matrix[upper[1], upper[0]] = row
+        if self.kind == "corr":
+            # A fund with a gap in the window has no defined correlation,
+            # with itself included: its whole row of pairs is NaN
+            np.fill_diagonal(matrix, np.nan)
+            undefined = np.isnan(matrix).all(axis=1) if n > 1 else False
+            np.fill_diagonal(matrix, np.where(undefined, np.nan, 1.0))
+        else:
+            np.fill_diagonal(matrix, self.variances[self.index.get_loc(date)])
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+    def top(self, date, k=10, absolute=False):
+        """The ``k`` most correlated pairs on ``date``, highest first.
+
+        Without stored triangles only the precomputed ``top_pairs`` can
+        answer, so ``k`` must not exceed ``top_k`` and ``absolute`` must
+        match the ranking they were computed with.
+        """
+        if self.triangles is None:
+            if self.top_pairs is None:
+                raise ValueError("neither triangles nor top pairs were stored")
+            if k > self.top_k:
+                raise ValueError(f"only the top {self.top_k} pairs were stored, not {k}")
+            if absolute != self.absolute:
+                raise ValueError(f"top pairs were ranked with absolute={self.absolute}")
+            return self.top_pairs.loc[[date]].head(k).reset_index(drop=True)
+        return _top_pairs(self.triangles[self.index.get_loc(date)], self.pairs(),
+                          self.columns, k, absolute)
+
+
+def _top_indices(row, k, absolute=False):
+    # Positions of the top-k entries of one triangle, highest first:
+    # argpartition (O(pairs)) and then a sort of the k winners only
+    scores = np.abs(row) if absolute else row
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    k = min(k, len(row))
+    if not k:
+        return np.array([], dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def _pairs_frame(best, values, pairs, columns):
+    # (fund_a, fund_b, value) rows for triangle positions ``best``
+    names = np.asarray(columns, dtype=object)
+    return pd.DataFrame({
+        "fund_a": names[pairs[0][best]],
+        "fund_b": names[pairs[1][best]],
+        "value": np.asarray(values, dtype=np.float64),
+    })
+
+
+def _top_pairs(row, pairs, columns, k, absolute=False):
+    best = _top_indices(row, k, absolute)
+    return _pairs_frame(best, row[best], pairs, columns)
+
+
+def rolling_correlation(returns, window=60, kind="corr", dtype=np.float64,
+                        store=True, top_k=None, absolute=False):
+    """Rolling fund-to-fund correlation (or covariance with ``kind="cov"``).
+
+    ``dtype=np.float32`` halves the stored triangles.  With ``top_k`` the
+    top-k pairs of every date are kept in ``top_pairs``; ``store=False``
+    skips the triangles entirely so memory does not grow with N^2 x dates.
+    """
+    if kind not in ("corr", "cov"):
+        raise ValueError(f"unknown kind {kind!r}, expected 'corr' or 'cov'")
+    columns = list(returns.columns)
+    values = returns.to_numpy(dtype=np.float64)
+    dates = len(values)
+    pairs = np.triu_indices(len(columns), 1)
+    triangles = np.full((dates, len(pairs[0])), np.nan, dtype=dtype) if store else None
+    keep_variances = store and kind == "cov"
+    variances = np.full((dates, len(columns)), np.nan, dtype=dtype) if keep_variances else None
+    top_dates, top_best, top_values = [], [], []
+
+    engine = RollingCorrelation(columns, window)
+    for row, x in enumerate(values):
+        engine.update(x)
+        if not engine.ready:
+            continue
+        matrix = engine.corr() if kind == "corr" else engine.cov()
+        upper = matrix[pairs]
+        if store:
+            triangles[row] = upper
+        if keep_variances:
+            variances[row] = np.diag(matrix)
+        if top_k:
+            best = _top_indices(upper, top_k, absolute)
+            top_dates.append(np.full(len(best), row))
+            top_best.append(best)
+            top_values.append(upper[best])
+
+    top_pairs = None
+    if top_k and top_best:
+        top_pairs = _pairs_frame(np.concatenate(top_best), np.concatenate(top_values),
+                                 pairs, columns)
+        top_pairs.index = returns.index[np.concatenate(top_dates)]
+    return RollingCorrelationResult(returns.index, columns, window, kind, triangles, top_pairs,
+                                    top_k, absolute, variances)
@@ -0,0 +1,387 @@
+"""Shared-memory results server for concurrent analyst sessions.
+
+Every notebook kernel that loads the NAV CSV and recomputes the
+``whale_navs_*`` frames holds its own copy of them.  ``ResultsServer`` is a
+long-lived local daemon that computes the tables once (the same ones as the
+``risk-return`` command line) and publishes them in named
+``multiprocessing.shared_memory`` blocks; ``attach`` maps them into a client
+session as read-only DataFrames without copying::
+
+    python shared_results.py Resources/whale_navs.csv --prefix whale_navs
+
+    from shared_results import attach
+    results = attach("whale_navs")
+    results["beta_rolling60"]["TIGER GLOBAL MANAGEMENT LLC"].tail()
+
+Layout, for prefix ``p``:
+
+* ``p_index``        - fixed 32 bytes: sequence counter, current version and
+  manifest length (uint64 each);
+* ``p_v<n>_manifest`` - JSON describing version ``n``: the source file and its
+  sha256, and per table the dtype, shape, byte offset, columns and index;
+* ``p_v<n>_data``     - every table and date index of version ``n`` in one
+  block, each array 64-byte aligned.
+
+A version is never modified once published.  When the NAV file changes
+(size or mtime, then confirmed by its sha256) the daemon writes version
+``n + 1`` and then switches the index under a sequence lock: the counter is
+odd while the index is written, and readers retry until they read the same
+even value before and after.  Versions older than the previous one are
+unlinked; sessions already attached to them keep their mapping until they
+``close`` or ``refresh``.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import risk_return_analysis as rra
+from nav_cache import file_sha256
+
+
+DEFAULT_PREFIX = "whale_navs"
+_ALIGN = 64
+# Index header: sequence counter, current version, manifest length
+_INDEX_FIELDS = 4
+_SEQ, _VERSION, _MANIFEST_SIZE = 0, 1, 2
+
+
+def _block_name(prefix, version, kind):
+    return f"{prefix}_v{version}_{kind}"
+
+
+def _attach_block(name):
+    # Attach without registering with this process' resource tracker, which
+    # would otherwise unlink the daemon's block when the session exits
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+def _header(block):
+    return np.ndarray((_INDEX_FIELDS,), dtype=np.uint64, buffer=block.buf)
+
+
+def _read_index(block, retries=1000):
+    # (version, manifest size) under the sequence lock
+    header = _header(block)
+    for _ in range(retries):
+        before = int(header[_SEQ])
+        version = int(header[_VERSION])
+        size = int(header[_MANIFEST_SIZE])
+        if before % 2 == 0 and int(header[_SEQ]) == before:
+            return version, size
+        time.sleep(0.001)
+    raise TimeoutError("shared results index is being rewritten")
+
+
+# ---
+# Daemon
+# ---
+
+def compute_tables(path, market=rra.MARKET, std_window=21, beta_window=60,
+                   num_trading_days=rra.NUM_TRADING_DAYS):
+    """The ``risk-return`` tables of ``path`` as a dict of float64 DataFrames."""
+    from risk_return_cli import run_pipeline
+
+    _, tables = run_pipeline(path, market, std_window, beta_window, num_trading_days)
+    return tables
+
+
+def _index_spec(index):
+    # Dates go into the data block as int64 nanoseconds; labels into the JSON
+    if isinstance(index, pd.DatetimeIndex):
+        return {"kind": "dates", "name": index.name}, index.as_unit("ns").asi8
+    return {"kind": "labels", "name": index.name, "values": [str(v) for v in index]}, None
+
+
+class ResultsServer:
+    """Publishes the tables of one NAV file in shared memory and keeps them fresh."""
+
+    def __init__(self, nav_path, prefix=DEFAULT_PREFIX, poll=2.0, **pipeline):
+        self.nav_path = Path(nav_path)
+        self.prefix = prefix
+        self.poll = poll
+        self.pipeline = pipeline
+        self.version = 0
+        self._stat = None
+        self._sha256 = None
+        self._versions = {}
+        self._stop = threading.Event()
+        self._index = shared_memory.SharedMemory(
+            name=f"{prefix}_index", create=True, size=_INDEX_FIELDS * 8)
+        _header(self._index)[:] = 0
+
+    def _source_stat(self):
+        stat = os.stat(self.nav_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def publish(self, tables=None):
+        """Write a new version (default: recomputed from the NAV file) and switch to it."""
+        stat = self._source_stat()
+        sha256 = file_sha256(self.nav_path)
+        if tables is None:
+            tables = compute_tables(self.nav_path, **self.pipeline)
+        version = self.version + 1
+
+        # Lay out every array in one block
+        specs, arrays, offset = {}, [], 0
+
+        def place(values):
+            nonlocal offset
+            offset = -(-offset // _ALIGN) * _ALIGN
+            arrays.append((offset, values))
+            start = offset
+            offset += values.nbytes
+            return start
+
+        for name, frame in tables.items():
+            values = np.ascontiguousarray(frame.to_numpy(dtype=np.float64))
+            index_spec, dates = _index_spec(frame.index)
+            if dates is not None:
+                index_spec["offset"] = place(dates)
+            specs[name] = {
+                "dtype": values.dtype.str,
+                "shape": list(values.shape),
+                "offset": place(values),
+                "columns": [str(column) for column in frame.columns],
+                "index": index_spec,
+            }
+
+        data = shared_memory.SharedMemory(
+            name=_block_name(self.prefix, version, "data"), create=True, size=max(offset, 1))
+        for start, values in arrays:
+            target = np.ndarray(values.shape, dtype=values.dtype, buffer=data.buf, offset=start)
+            target[...] = values
+            del target
+        manifest = json.dumps({
+            "version": version,
+            "source": str(self.nav_path),
+            "sha256": sha256,
+            "published": time.time(),
+            "pipeline": self.pipeline,
+            "data": data.name,
+            "tables": specs,
+        }).encode("utf-8")
+        block = shared_memory.SharedMemory(
+            name=_block_name(self.prefix, version, "manifest"), create=True, size=len(manifest))
+        block.buf[:len(manifest)] = manifest
+        self._versions[version] = (block, data)
+
+        header = _header(self._index)
+        header[_SEQ] += 1
+        header[_VERSION] = version
+        header[_MANIFEST_SIZE] = len(manifest)
+        header[_SEQ] += 1
+        del header
+
+        self.version, self._stat, self._sha256 = version, stat, sha256
+        # Keep the previous version for sessions that are attaching right now
+        for old in [v for v in self._versions if v < version - 1]:
+            for shm in self._versions.pop(old):
+                shm.close()
+                shm.unlink()
+        return version
+
+    def refresh(self):
+        """Publish a new version if the NAV file content changed; returns whether it did."""
+        stat = self._source_stat()
+        if stat == self._stat:
+            return False
+        if file_sha256(self.nav_path) == self._sha256:
+            # Touched but identical: only remember the new size / mtime
+            self._stat = stat
+            return False
+        self.publish()
+        return True
+
+    def serve_forever(self, on_error=None):
+        """Publish, then poll the NAV file every ``poll`` seconds until ``stop``."""
+        if self.version == 0:
+            self.publish()
+        while not self._stop.wait(self.poll):
+            try:
+                self.refresh()
+            except (OSError, ValueError, KeyError) as exc:
+                # Keep serving the last good version (e.g. a half-written file)
+                if on_error is not None:
+                    on_error(exc)
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        """Unlink every block; attached sessions keep their mappings."""
+        self.stop()
+        for blocks in self._versions.values():
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+        self._versions.clear()
+        self._index.close()
+        self._index.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---
+# Client sessions
+# ---
+
+class SharedResults:
+    """Read-only, zero-copy view of one published version.
+
+    Tables are DataFrames backed by the shared block; ``refresh`` switches to
+    the newest version.  Drop references to the frames before ``close``.
+    """
+
+    def __init__(self, prefix=DEFAULT_PREFIX, retries=10):
+        self.prefix = prefix
+        self._index = _attach_block(f"{prefix}_index")
+        self._data = None
+        self.tables = {}
+        self.manifest = None
+        self._attach(retries)
+
+    def _attach(self, retries):
+        for attempt in range(retries):
+            version, size = _read_index(self._index)
+            if version == 0:
+                if self._data is None:
+                    # Failing in the constructor: nothing else will close it
+                    self._index.close()
+                raise FileNotFoundError(f"nothing published under {self.prefix!r} yet")
+            try:
+                manifest_block = _attach_block(_block_name(self.prefix, version, "manifest"))
+                try:
+                    manifest = json.loads(bytes(manifest_block.buf[:size]))
+                finally:
+                    manifest_block.close()
+                data = _attach_block(manifest["data"])
+            except FileNotFoundError:
+                # Unlinked between reading the index and attaching: read it again
+                if attempt == retries - 1:
+                    raise
+                continue
+            self._release()
+            self._data, self.manifest = data, manifest
+            self.tables = {name: self._frame(spec) for name, spec in manifest["tables"].items()}
+            return
+
+    def _array(self, dtype, shape, offset):
+        values = np.ndarray(shape, dtype=dtype, buffer=self._data.buf, offset=offset)
+        values.flags.writeable = False
+        return values
+
+    def _frame(self, spec):
+        values = self._array(np.dtype(spec["dtype"]), tuple(spec["shape"]), spec["offset"])
+        index = spec["index"]
+        if index["kind"] == "dates":
+            dates = self._array(np.int64, (values.shape[0],), index["offset"])
+            labels = pd.DatetimeIndex(dates.view("datetime64[ns]"), name=index["name"])
+        else:
+            labels = pd.Index(index["values"], name=index["name"])
+        return pd.DataFrame(values, index=labels, columns=spec["columns"], copy=False)
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def stale(self):
+        """Whether the daemon has published a newer version."""
+        return _read_index(self._index)[0] != self.version
+
+    def refresh(self, retries=10):
+        """Switch to the newest version; returns whether it changed."""
+        if not self.stale():
+            return False
+        self._attach(retries)
+        return True
+
+    def _release(self):
+        self.tables = {}
+        if self._data is not None:
+            try:
+                self._data.close()
+            except BufferError:
+                # Frames still referenced elsewhere keep the mapping alive
+                pass
+            self._data = None
+
+    def close(self):
+        self._release()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(prefix=DEFAULT_PREFIX):
+    """Attach to the tables published under ``prefix``."""
+    return SharedResults(prefix)
+
+
+# ---
+# Entry point
+# ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish risk / return tables in shared memory.")
+    parser.add_argument("nav_path", nargs="?", type=Path, default=rra.DEFAULT_NAV_PATH)
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--poll", type=float, default=2.0,
+                        help="seconds between checks of the NAV file (default: %(default)s)")
+    parser.add_argument("--market", default=rra.MARKET)
+    parser.add_argument("--std-window", type=int, default=21)
+    parser.add_argument("--beta-window", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    try:
+        server = ResultsServer(args.nav_path, args.prefix, args.poll, market=args.market,
+                               std_window=args.std_window, beta_window=args.beta_window)
+    except FileExistsError:
+        print(f"shared results {args.prefix!r} are already published", file=sys.stderr)
+        return 1
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    try:
+        server.publish()
+        print(f"published {args.nav_path} as {args.prefix!r} version {server.version}")
+        server.serve_forever(
+            on_error=lambda exc: print(f"refresh failed: {exc}", file=sys.stderr))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"shared results: {type(exc).__name__}: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())